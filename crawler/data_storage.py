@@ -6,28 +6,127 @@ This module handles persistence, database access, and data conversion
 for the Reddit opportunity crawler system.
 """
 
+import functools
 import json
 import os
+import sqlite3
 import time
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-from tinydb import TinyDB, Query
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _dumps(obj: Any, pretty: bool = False) -> str:
+    """Serialize obj to a JSON string, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0).decode('utf-8')
+    return json.dumps(obj, indent=2) if pretty else json.dumps(obj, separators=(',', ':'))
+
+def _loads(data) -> Any:
+    """Parse a JSON str or bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dump(obj: Any, path: str, pretty: bool = False):
+    """Write obj as JSON to path."""
+    with open(path, 'wb') as f:
+        f.write(_dumps(obj, pretty).encode('utf-8'))
+
+def _load(path: str) -> Any:
+    """Read and parse the JSON file at path."""
+    with open(path, 'rb') as f:
+        return _loads(f.read())
 
 # Constants
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'crawler', 'data')
-os.makedirs(DATA_DIR, exist_ok=True)
 
-RAW_DATA_PATH = os.path.join(DATA_DIR, 'threads_raw.json')
+RAW_DATA_PATH = os.path.join(DATA_DIR, 'threads_raw.jsonl')
 OPPORTUNITIES_PATH = os.path.join(DATA_DIR, 'opportunities.json')
 DB_PATH = os.path.join(DATA_DIR, 'affiliate_data.json')
+SQLITE_PATH = os.path.join(DATA_DIR, 'opportunities.db')
 
-# Initialize TinyDB
-db = TinyDB(DB_PATH)
-opportunities_table = db.table('opportunities')
+SCHEMA_VERSION = 2
+
+def _init_db(conn: sqlite3.Connection):
+    """Create or upgrade the opportunities schema and migrate legacy TinyDB records."""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    
+    if version < 1:
+        with conn:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS opportunities (
+                    thread_id TEXT PRIMARY KEY,
+                    status TEXT,
+                    subreddit TEXT,
+                    action_type TEXT,
+                    opportunity_score REAL,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_opportunities_status ON opportunities (status);
+                CREATE INDEX IF NOT EXISTS idx_opportunities_subreddit ON opportunities (subreddit);
+                CREATE INDEX IF NOT EXISTS idx_opportunities_score ON opportunities (opportunity_score DESC);
+            ''')
+            
+            # Opportunities used to live in the TinyDB file; carry them over once
+            if os.path.exists(DB_PATH):
+                from tinydb import TinyDB
+                legacy_db = TinyDB(DB_PATH)
+                legacy = legacy_db.table('opportunities').all()
+                legacy_db.close()
+                _upsert_many(conn, legacy)
+            
+            conn.execute('PRAGMA user_version = 1')
+    
+    if version < 2:
+        # Filtered top-N queries walk these in score order and stop at the
+        # LIMIT, instead of collecting every match and sorting it
+        with conn:
+            conn.executescript('''
+                DROP INDEX IF EXISTS idx_opportunities_status;
+                DROP INDEX IF EXISTS idx_opportunities_subreddit;
+                CREATE INDEX IF NOT EXISTS idx_opportunities_status_score
+                    ON opportunities (status, opportunity_score DESC);
+                CREATE INDEX IF NOT EXISTS idx_opportunities_subreddit_score
+                    ON opportunities (subreddit, opportunity_score DESC);
+            ''')
+            conn.execute('PRAGMA user_version = 2')
+
+def _upsert_many(conn: sqlite3.Connection, opps: List[Dict[str, Any]]):
+    """Insert or replace opportunity rows in a single executemany call."""
+    conn.executemany(
+        '''INSERT OR REPLACE INTO opportunities
+           (thread_id, status, subreddit, action_type, opportunity_score, data)
+           VALUES (?, ?, ?, ?, ?, ?)''',
+        [
+            (
+                opp.get('thread_id'),
+                opp.get('status'),
+                opp.get('subreddit'),
+                opp.get('action_type'),
+                opp.get('opportunity_score'),
+                _dumps(opp)
+            )
+            for opp in opps
+        ]
+    )
+
+@functools.lru_cache(maxsize=1)
+def _db() -> sqlite3.Connection:
+    """Open the opportunities database on first use and reuse the connection."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(SQLITE_PATH)
+    _init_db(conn)
+    return conn
 
 def save_to_db(opportunities: List[Dict[str, Any]]) -> int:
     """
-    Save opportunities to TinyDB
+    Save opportunities to the SQLite database
     
     Args:
         opportunities: List of opportunity objects
@@ -35,24 +134,45 @@ def save_to_db(opportunities: List[Dict[str, Any]]) -> int:
     Returns:
         Number of new records inserted
     """
-    Thread = Query()
+    db = _db()
+    
+    # Look up all incoming thread IDs in one query rather than one per record
+    thread_ids = _dumps([opp.get('thread_id') for opp in opportunities])
+    existing_by_id = {
+        thread_id: (score, action_type)
+        for thread_id, score, action_type in db.execute(
+            '''SELECT thread_id, opportunity_score, action_type FROM opportunities
+               WHERE thread_id IN (SELECT value FROM json_each(?))''',
+            (thread_ids,)
+        )
+    }
+    
+    # Collect the rows to write so they go out in a single batch; keyed by
+    # thread_id so a thread repeated in the input is written once
+    pending = {}
     new_count = 0
     
     for opp in opportunities:
-        # Check if this thread is already in the DB
-        existing = opportunities_table.get(Thread.thread_id == opp.get('thread_id'))
+        thread_id = opp.get('thread_id')
+        existing = existing_by_id.get(thread_id)
         
         if not existing:
             # Insert new record
-            opportunities_table.insert(opp)
+            pending[thread_id] = opp
             new_count += 1
         else:
             # Update existing record if score or other relevant fields have changed
-            if (opp.get('opportunity_score') != existing.get('opportunity_score') or
-                opp.get('action_type') != existing.get('action_type') or
+            existing_score, existing_action = existing
+            if (opp.get('opportunity_score') != existing_score or
+                opp.get('action_type') != existing_action or
                 opp.get('status') == 'new'):  # Always update new status opportunities
                 
-                opportunities_table.update(opp, Thread.thread_id == opp.get('thread_id'))
+                pending[thread_id] = opp
+        
+        existing_by_id[thread_id] = (opp.get('opportunity_score'), opp.get('action_type'))
+    
+    with db:
+        _upsert_many(db, list(pending.values()))
     
     return new_count
 
@@ -76,42 +196,32 @@ def get_opportunities(
     Returns:
         List of opportunity objects
     """
-    Thread = Query()
-    query_parts = []
-    
-    # Build query
-    if status:
-        query_parts.append(Thread.status == status)
+    # Build query from whichever filters were given; blank strings are
+    # treated as "no filter", a min_score of 0 is still applied
+    filters = [
+        ('status = ?', status or None),
+        ('subreddit = ?', subreddit or None),
+        ('action_type = ?', action_type or None),
+        ('opportunity_score >= ?', min_score)
+    ]
+    active_filters = [(condition, value) for condition, value in filters if value is not None]
+    conditions = [condition for condition, _ in active_filters]
+    params = [value for _, value in active_filters]
     
-    if min_score is not None:
-        query_parts.append(Thread.opportunity_score >= min_score)
-    
-    if subreddit:
-        query_parts.append(Thread.subreddit == subreddit)
-    
-    if action_type:
-        query_parts.append(Thread.action_type == action_type)
-    
-    # Execute query
-    if query_parts:
+    sql = 'SELECT data FROM opportunities'
+    if conditions:
         # Combine all conditions with AND
-        result = opportunities_table.search(
-            query_parts[0] if len(query_parts) == 1 else 
-            (query_parts[0] & query_parts[1] if len(query_parts) == 2 else
-             (query_parts[0] & query_parts[1] & query_parts[2]) if len(query_parts) == 3 else
-             (query_parts[0] & query_parts[1] & query_parts[2] & query_parts[3]))
-        )
-    else:
-        result = opportunities_table.all()
+        sql += ' WHERE ' + ' AND '.join(conditions)
     
     # Sort by opportunity score (highest first)
-    result.sort(key=lambda x: x.get('opportunity_score', 0), reverse=True)
+    sql += ' ORDER BY opportunity_score DESC'
     
     # Apply limit
     if limit:
-        result = result[:limit]
+        sql += ' LIMIT ?'
+        params.append(limit)
     
-    return result
+    return [_loads(row[0]) for row in _db().execute(sql, params)]
 
 def update_opportunity_status(thread_id: str, status: str) -> bool:
     """
@@ -124,9 +234,15 @@ def update_opportunity_status(thread_id: str, status: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    Thread = Query()
-    result = opportunities_table.update({'status': status}, Thread.thread_id == thread_id)
-    return len(result) > 0
+    db = _db()
+    with db:
+        cursor = db.execute(
+            '''UPDATE opportunities
+               SET status = ?, data = json_set(data, '$.status', ?)
+               WHERE thread_id = ?''',
+            (status, status, thread_id)
+        )
+    return cursor.rowcount > 0
 
 def get_top_opportunities(count: int = 10) -> List[Dict[str, Any]]:
     """
@@ -138,9 +254,11 @@ def get_top_opportunities(count: int = 10) -> List[Dict[str, Any]]:
     Returns:
         List of top opportunities
     """
-    opps = opportunities_table.all()
-    opps.sort(key=lambda x: x.get('opportunity_score', 0), reverse=True)
-    return opps[:count]
+    rows = _db().execute(
+        'SELECT data FROM opportunities ORDER BY opportunity_score DESC LIMIT ?',
+        (count,)
+    )
+    return [_loads(row[0]) for row in rows]
 
 def export_to_json() -> str:
     """
@@ -149,11 +267,10 @@ def export_to_json() -> str:
     Returns:
         Path to the exported file
     """
-    opps = opportunities_table.all()
+    opps = [_loads(row[0]) for row in _db().execute('SELECT data FROM opportunities')]
     export_path = os.path.join(DATA_DIR, f'export_{int(time.time())}.json')
     
-    with open(export_path, 'w') as f:
-        json.dump(opps, f, indent=2)
+    _dump(opps, export_path, pretty=True)
     
     return export_path
 
@@ -168,8 +285,7 @@ def import_from_json(file_path: str) -> int:
         Number of imported records
     """
     try:
-        with open(file_path, 'r') as f:
-            opps = json.load(f)
+        opps = _load(file_path)
         
         if not isinstance(opps, list):
             print(f"Error: Expected a list of opportunities, got {type(opps)}")
@@ -183,7 +299,7 @@ def import_from_json(file_path: str) -> int:
 
 def sync_opportunities_from_file() -> int:
     """
-    Synchronize opportunities from the opportunities.json file to TinyDB
+    Synchronize opportunities from the opportunities.json file to the database
     
     Returns:
         Number of new records imported
@@ -193,8 +309,7 @@ def sync_opportunities_from_file() -> int:
         return 0
     
     try:
-        with open(OPPORTUNITIES_PATH, 'r') as f:
-            opps = json.load(f)
+        opps = _load(OPPORTUNITIES_PATH)
         
         return save_to_db(opps)
         
@@ -209,9 +324,10 @@ def main():
     print(f"Imported {new_count} new opportunities.")
     
     # Print some stats
-    total = len(opportunities_table.all())
-    new_opps = len(opportunities_table.search(Query().status == 'new'))
-    processed = len(opportunities_table.search(Query().status == 'processed'))
+    status_counts = dict(_db().execute('SELECT status, COUNT(*) FROM opportunities GROUP BY status'))
+    total = sum(status_counts.values())
+    new_opps = status_counts.get('new', 0)
+    processed = status_counts.get('processed', 0)
     
     print(f"\nDatabase Statistics:")
     print(f"  Total opportunities: {total}")
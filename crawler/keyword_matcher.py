@@ -6,20 +6,53 @@ This module analyzes scraped Reddit threads and matches them against affiliate k
 It scores opportunities based on relevance, intent, and potential for affiliate marketing.
 """
 
+import atexit
+import functools
 import json
 import os
 import re
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
+from collections import defaultdict
 from datetime import datetime
 import random
-from tinydb import TinyDB, Query
+from tinydb import TinyDB
+from tinydb.middlewares import CachingMiddleware
+from tinydb.storages import JSONStorage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _dumps(obj: Any, pretty: bool = False) -> str:
+    """Serialize obj to a JSON string, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0).decode('utf-8')
+    return json.dumps(obj, indent=2) if pretty else json.dumps(obj, separators=(',', ':'))
+
+def _loads(data) -> Any:
+    """Parse a JSON str or bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dump(obj: Any, path: str, pretty: bool = False):
+    """Write obj as JSON to path."""
+    with open(path, 'wb') as f:
+        f.write(_dumps(obj, pretty).encode('utf-8'))
+
+def _load(path: str) -> Any:
+    """Read and parse the JSON file at path."""
+    with open(path, 'rb') as f:
+        return _loads(f.read())
 
 # Constants
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'crawler', 'data')
-os.makedirs(DATA_DIR, exist_ok=True)
 
-RAW_DATA_PATH = os.path.join(DATA_DIR, 'threads_raw.json')
+RAW_DATA_PATH = os.path.join(DATA_DIR, 'threads_raw.jsonl')
+LEGACY_RAW_DATA_PATH = os.path.join(DATA_DIR, 'threads_raw.json')
 OPPORTUNITIES_PATH = os.path.join(DATA_DIR, 'opportunities.json')
+OPPORTUNITY_IDS_PATH = os.path.join(DATA_DIR, 'opportunities.ids')
 DB_PATH = os.path.join(DATA_DIR, 'affiliate_data.json')
 
 # Intent patterns
@@ -30,7 +63,7 @@ INTENT_PATTERNS = {
         r'good .* for', r'need .* recommendation'
     ],
     'COMPARISON': [
-        r'(vs|versus|or|\bor\b)', r'compare', r'difference between', r'which is better',
+        r'compare', r'difference between', r'which is better',
         r'(better|worse) than', r'(alternative|comparison)'
     ],
     'SHOWCASE': [
@@ -43,14 +76,55 @@ INTENT_PATTERNS = {
     ]
 }
 
-# Setup TinyDB for storing affiliate programs and keywords
-db = TinyDB(DB_PATH)
-affiliate_programs_table = db.table('affiliate_programs')
-keywords_table = db.table('keywords')
-subreddits_table = db.table('subreddits')
+# Single-word intent markers, matched against the thread's word tokens so
+# that e.g. 'or' does not fire inside 'for' or 'more'
+INTENT_TOKENS = {
+    'COMPARISON': {'vs', 'versus', 'or'}
+}
+
+_WORD_RE = re.compile(r'\w+')
+
+# Each intent's patterns fused into one alternation, compiled once at import.
+# IGNORECASE stays on because some patterns (e.g. 'I made') are not lowercase.
+_COMPILED_INTENTS = [
+    (
+        intent,
+        re.compile('|'.join(f'(?:{p})' for p in patterns), re.IGNORECASE),
+        frozenset(INTENT_TOKENS.get(intent, ()))
+    )
+    for intent, patterns in INTENT_PATTERNS.items()
+]
+
+# Intent factor for opportunity scoring (0-25 points)
+INTENT_SCORES = {
+    'DISCOVERY': 25,    # Highest value - explicitly looking for recommendations
+    'COMPARISON': 20,   # Comparing options - good for affiliate
+    'QUESTION': 15,     # Asking questions - might be receptive to solutions
+    'SHOWCASE': 5,      # Showing off - less receptive to recommendations
+    'GENERAL': 10       # General discussion - moderate opportunity
+}
+
+@functools.lru_cache(maxsize=1)
+def _db() -> TinyDB:
+    """
+    Open the TinyDB store for affiliate programs and keywords on first use
+    
+    CachingMiddleware keeps the file contents in memory, so reads don't
+    re-parse the JSON file and writes are flushed in one go (explicitly via
+    storage.flush(), or when the process exits).
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    db = TinyDB(DB_PATH, storage=CachingMiddleware(JSONStorage))
+    atexit.register(db.close)
+    return db
 
 def setup_sample_data():
     """Initialize sample data if tables are empty."""
+    db = _db()
+    affiliate_programs_table = db.table('affiliate_programs')
+    keywords_table = db.table('keywords')
+    subreddits_table = db.table('subreddits')
+    
     # Only add if tables are empty
     if not affiliate_programs_table.all():
         affiliate_programs_table.insert_multiple([
@@ -90,6 +164,13 @@ def setup_sample_data():
             {'id': 4, 'name': 'r/GamingMouse', 'category': 'Gaming', 'subscriber_count': 50000},
             {'id': 5, 'name': 'r/MechanicalKeyboards', 'category': 'Gaming', 'subscriber_count': 700000},
         ])
+    
+    # Persist any sample data right away rather than at exit
+    db.storage.flush()
+
+def _thread_text(title: str, body: str) -> str:
+    """Combine title and body into the lowercased text used for matching."""
+    return f"{title.lower()} {body.lower() if body else ''}"
 
 def detect_thread_intent(title: str, body: str) -> str:
     """
@@ -103,16 +184,74 @@ def detect_thread_intent(title: str, body: str) -> str:
         Intent type: DISCOVERY, COMPARISON, SHOWCASE, QUESTION, or GENERAL
     """
     # Combine title and body for matching, prioritizing title
-    text = f"{title.lower()} {body.lower() if body else ''}"
-    
-    for intent, patterns in INTENT_PATTERNS.items():
-        for pattern in patterns:
-            if re.search(pattern, text, re.IGNORECASE):
+    return _detect_text_intent(_thread_text(title, body))
+
+def _detect_text_intent(text: str) -> str:
+    """Detect intent from already combined and lowercased thread text."""
+    tokens = None
+    for intent, pattern, intent_tokens in _COMPILED_INTENTS:
+        if pattern.search(text):
+            return intent
+        if intent_tokens:
+            # Tokenize lazily, only once an intent with word markers is reached
+            if tokens is None:
+                tokens = set(_WORD_RE.findall(text))
+            if not intent_tokens.isdisjoint(tokens):
                 return intent
     
     return "GENERAL"
 
-def match_affiliate_keywords(title: str, body: str, subreddit: str) -> List[Dict[str, Any]]:
+@functools.lru_cache(maxsize=8)
+def _compile_keyword_pattern(keywords: Tuple[str, ...]) -> re.Pattern:
+    """
+    Build a single regex that finds any of the given keywords in one pass
+    
+    Cached per keyword set, so it is only rebuilt when the keywords table changes.
+    
+    Args:
+        keywords: Lowercased keywords
+        
+    Returns:
+        Compiled alternation of all keywords
+    """
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+def load_match_tables() -> Dict[str, Any]:
+    """
+    Load keywords, affiliate programs and subreddits once for a matching run
+    
+    Returns:
+        Dict with the lowercased (keyword, program doc_id) terms, programs
+        keyed by doc_id, lowercased subreddit names grouped by category and
+        the compiled keyword pattern
+    """
+    db = _db()
+    keywords = db.table('keywords').all()
+    programs = db.table('affiliate_programs').all()
+    subreddits = db.table('subreddits').all()
+    
+    # Lowercased once here instead of for every thread
+    keyword_terms = [(entry['keyword'].lower(), entry['affiliate_program_id']) for entry in keywords]
+    
+    subreddits_by_category: Dict[str, Set[str]] = defaultdict(set)
+    for sub in subreddits:
+        subreddits_by_category[sub['category']].add(sub['name'].lower())
+    
+    return {
+        'programs_by_id': {program.doc_id: program for program in programs},
+        'subreddits_by_category': subreddits_by_category,
+        'keyword_terms': keyword_terms,
+        'keyword_pattern': _compile_keyword_pattern(
+            tuple(keyword for keyword, _ in keyword_terms)
+        )
+    }
+
+def match_affiliate_keywords(
+    title: str,
+    body: str,
+    subreddit: str,
+    tables: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
     """
     Match thread content against affiliate keywords and programs
     
@@ -120,47 +259,61 @@ def match_affiliate_keywords(title: str, body: str, subreddit: str) -> List[Dict
         title: Thread title
         body: Thread body/content
         subreddit: Subreddit name
+        tables: Lookup tables from load_match_tables (loaded if omitted)
         
     Returns:
         List of matching affiliate programs with match details
     """
-    # Get all keywords
-    all_keywords = keywords_table.all()
-    matches = []
+    if tables is None:
+        tables = load_match_tables()
     
     # Combine title and body for matching
-    text = f"{title.lower()} {body.lower() if body else ''}"
-    
-    for keyword_entry in all_keywords:
-        keyword = keyword_entry['keyword'].lower()
+    return _match_text_keywords(_thread_text(title, body), title.lower(), subreddit.lower(), tables)
+
+def _match_text_keywords(
+    text: str,
+    title_lower: str,
+    subreddit_lower: str,
+    tables: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """Match already combined and lowercased thread text against affiliate keywords."""
+    matches = []
+    if not tables['keyword_terms']:
+        return matches
+    
+    # Most threads contain none of the keywords; a single scan for any of
+    # them lets those skip the per-keyword loop entirely
+    if not tables['keyword_pattern'].search(text):
+        return matches
+    
+    for keyword, program_id in tables['keyword_terms']:
+        # Simple keyword matching (could be improved with NLP); a zero count
+        # means the keyword is absent, so one scan covers both checks
+        count = text.count(keyword)
+        if not count:
+            continue
         
-        # Simple keyword matching (could be improved with NLP)
-        if keyword in text:
-            # Get the affiliate program for this keyword
-            program = affiliate_programs_table.get(doc_id=keyword_entry['affiliate_program_id'])
-            if program:
-                # Calculate match strength (basic implementation)
-                title_match = keyword in title.lower()
-                count = text.count(keyword)
-                strength = 0.7 if title_match else 0.4
-                strength += min(0.3, count * 0.1)  # Increase slightly with frequency
-                
-                # Check if subreddit is relevant to program category
-                relevant_subreddits = subreddits_table.search(
-                    Query().category == program['category']
-                )
-                subreddit_relevant = any(s['name'].lower() == subreddit.lower() for s in relevant_subreddits)
-                if subreddit_relevant:
-                    strength += 0.2
-                
-                matches.append({
-                    'keyword': keyword,
-                    'program': program,
-                    'strength': min(1.0, strength),  # Cap at 1.0
-                    'title_match': title_match,
-                    'count': count,
-                    'subreddit_relevant': subreddit_relevant
-                })
+        # Get the affiliate program for this keyword
+        program = tables['programs_by_id'].get(program_id)
+        if program:
+            # Calculate match strength (basic implementation)
+            title_match = keyword in title_lower
+            strength = 0.7 if title_match else 0.4
+            strength += min(0.3, count * 0.1)  # Increase slightly with frequency
+            
+            # Check if subreddit is relevant to program category
+            subreddit_relevant = subreddit_lower in tables['subreddits_by_category'].get(program['category'], ())
+            if subreddit_relevant:
+                strength += 0.2
+            
+            matches.append({
+                'keyword': keyword,
+                'program': program,
+                'strength': min(1.0, strength),  # Cap at 1.0
+                'title_match': title_match,
+                'count': count,
+                'subreddit_relevant': subreddit_relevant
+            })
     
     return matches
 
@@ -180,50 +333,96 @@ def calculate_opportunity_score(
     Returns:
         Opportunity score from 0-100
     """
-    base_score = 50  # Start at middle
+    return calculate_opportunity_scores([thread], [intent], [affiliate_matches])[0]
+
+def calculate_opportunity_scores(
+    threads: List[Dict[str, Any]],
+    intents: List[str],
+    affiliate_matches: List[List[Dict[str, Any]]]
+) -> List[float]:
+    """
+    Calculate opportunity scores (0-100) for a batch of threads
     
-    # Upvotes factor (0-15 points)
-    upvotes = thread.get('upvotes', 0)
-    upvote_score = min(15, upvotes / 20)  # Cap at 15 points
-    
-    # Comments factor (0-10 points)
-    comments = thread.get('comments', 0)
-    comment_score = min(10, comments / 5)  # Cap at 10 points
-    
-    # Intent factor (0-25 points)
-    intent_scores = {
-        'DISCOVERY': 25,    # Highest value - explicitly looking for recommendations
-        'COMPARISON': 20,   # Comparing options - good for affiliate
-        'QUESTION': 15,     # Asking questions - might be receptive to solutions
-        'SHOWCASE': 5,      # Showing off - less receptive to recommendations
-        'GENERAL': 10       # General discussion - moderate opportunity
-    }
-    intent_score = intent_scores.get(intent, 10)
+    The reference time, lookup tables and timestamp parsing are resolved
+    once for the whole batch rather than once per thread.
     
-    # Affiliate match factor (0-40 points)
-    match_score = 0
-    if affiliate_matches:
-        # Take the highest match strength
-        best_match = max(affiliate_matches, key=lambda x: x['strength'])
-        match_score = best_match['strength'] * 40
+    Args:
+        threads: Reddit thread data
+        intents: Detected intent for each thread
+        affiliate_matches: Affiliate match data for each thread
+        
+    Returns:
+        Opportunity scores from 0-100, in input order
+    """
+    now_epoch = datetime.now().timestamp()
     
-    # Fresh content bonus (0-10 points)
-    created_str = thread.get('created_utc', '')
+    # Fresh content bonus (0-10 points). Threads scraped from the same page
+    # share timestamps, so each distinct value is parsed only once
+    created_epochs: Dict[Any, Optional[float]] = {}
+    freshness_scores = []
+    for thread in threads:
+        created_str = thread.get('created_utc', '')
+        if created_str not in created_epochs:
+            created_epochs[created_str] = _parse_epoch(created_str)
+        created_epoch = created_epochs[created_str]
+        
+        if created_epoch is None:
+            freshness_scores.append(5)  # Default if date parsing fails
+        else:
+            age_hours = (now_epoch - created_epoch) / 3600
+            freshness_scores.append(max(0, 10 - (age_hours / 24)))  # Newer is better
+    
+    return _score_kernel(
+        [thread.get('upvotes', 0) for thread in threads],
+        [thread.get('comments', 0) for thread in threads],
+        [INTENT_SCORES.get(intent, 10) for intent in intents],
+        [max((match['strength'] for match in matches), default=0) for matches in affiliate_matches],
+        freshness_scores
+    )
+
+def _parse_epoch(created_str: str) -> Optional[float]:
+    """Convert an ISO timestamp to epoch seconds, or None if it can't be parsed."""
     try:
-        created_date = datetime.fromisoformat(created_str)
-        now = datetime.now()
-        age_hours = (now - created_date).total_seconds() / 3600
-        freshness_score = max(0, 10 - (age_hours / 24))  # Newer is better
+        return datetime.fromisoformat(created_str).timestamp()
     except (ValueError, TypeError):
-        freshness_score = 5  # Default if date parsing fails
-    
-    # Calculate total score
-    total_score = base_score + upvote_score + comment_score + intent_score + match_score + freshness_score
+        return None
+
+def _score_kernel(
+    upvotes: List[float],
+    comments: List[float],
+    intent_scores: List[float],
+    best_strengths: List[float],
+    freshness_scores: List[float]
+) -> List[float]:
+    """
+    Combine per-thread numeric factors into 0-100 opportunity scores
     
-    # Normalize to 0-100 range
-    normalized_score = min(100, max(0, total_score))
+    Works on plain numeric columns only, so the loop does no dict lookups
+    or date handling.
     
-    return normalized_score
+    Args:
+        upvotes: Upvote count per thread
+        comments: Comment count per thread
+        intent_scores: Intent factor per thread (0-25 points)
+        best_strengths: Highest affiliate match strength per thread (0-1)
+        freshness_scores: Fresh content bonus per thread (0-10 points)
+        
+    Returns:
+        Opportunity scores from 0-100, in input order
+    """
+    base_score = 50  # Start at middle
+    return [
+        min(100, max(0, (
+            base_score
+            + min(15, upvote / 20)    # Upvotes factor (0-15 points)
+            + min(10, comment / 5)    # Comments factor (0-10 points)
+            + intent_score            # Intent factor (0-25 points)
+            + strength * 40           # Affiliate match factor (0-40 points)
+            + freshness               # Fresh content bonus (0-10 points)
+        )))
+        for upvote, comment, intent_score, strength, freshness
+        in zip(upvotes, comments, intent_scores, best_strengths, freshness_scores)
+    ]
 
 def determine_action_type(score: float, intent: str) -> str:
     """
@@ -243,22 +442,68 @@ def determine_action_type(score: float, intent: str) -> str:
     else:
         return 'post'
 
-def process_threads_to_opportunities():
+def _load_json_array(path: str) -> Optional[List[Any]]:
+    """
+    Read the JSON array stored at path
+    
+    Args:
+        path: Path to a file containing a JSON array
+        
+    Returns:
+        The array elements, or None if the file isn't a valid JSON array
+    """
+    try:
+        data = _load(path)
+    except ValueError:
+        return None
+    return data if isinstance(data, list) else None
+
+def _iter_json_lines(path: str) -> Iterator[Any]:
+    """Yield the JSON values stored one per line at path, skipping damaged lines."""
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield _loads(line)
+            except ValueError:
+                continue
+
+def process_threads_to_opportunities(new_threads: Optional[List[Dict[str, Any]]] = None):
     """
     Process raw Reddit threads and create opportunities
+    
+    Matching work is proportional to the threads processed; saving reads
+    the opportunity ID sidecar, so it also grows with the number of stored
+    opportunities (not with the raw thread corpus).
+    
+    Args:
+        new_threads: Threads to process, typically the ones the scraper just
+            saved. If None, every thread in the raw data file is processed,
+            e.g. to pick up matches for newly added keywords.
     """
     # Ensure we have sample data
     setup_sample_data()
-    
-    # Load raw threads
-    if not os.path.exists(RAW_DATA_PATH):
+    tables = load_match_tables()
+    
+    # Stream threads from disk; only the ones that match are kept. A raw data
+    # file from before the JSON Lines layout is read whole until the scraper
+    # migrates it
+    if new_threads is not None:
+        threads = new_threads
+    elif os.path.exists(RAW_DATA_PATH):
+        threads = _iter_json_lines(RAW_DATA_PATH)
+    elif os.path.exists(LEGACY_RAW_DATA_PATH):
+        threads = _load_json_array(LEGACY_RAW_DATA_PATH)
+        if threads is None:
+            print(f"Raw data file is not a valid JSON array: {LEGACY_RAW_DATA_PATH}")
+            return []
+    else:
         print(f"Raw data file not found: {RAW_DATA_PATH}")
         return []
     
-    with open(RAW_DATA_PATH, 'r') as f:
-        threads = json.load(f)
-    
     opportunities = []
+    candidates = []
     
     for thread in threads:
         # Extract thread data
@@ -270,19 +515,33 @@ def process_threads_to_opportunities():
         if not title or not subreddit:
             continue
         
-        # Detect intent
-        intent = detect_thread_intent(title, body)
+        # Lowercase the thread text once for both intent and keyword matching
+        text = _thread_text(title, body)
         
-        # Match with affiliate keywords
-        affiliate_matches = match_affiliate_keywords(title, body, subreddit)
+        # Match with affiliate keywords first; most threads have no match
+        # and are dropped, so intent is only detected for the rest
+        affiliate_matches = _match_text_keywords(text, title.lower(), subreddit.lower(), tables)
         
         # Skip if no matches found
         if not affiliate_matches:
             continue
         
-        # Calculate opportunity score
-        score = calculate_opportunity_score(thread, intent, affiliate_matches)
+        # Detect intent
+        intent = _detect_text_intent(text)
         
+        candidates.append((thread, title, body, subreddit, intent, affiliate_matches))
+    
+    # Score all matched threads in one batch
+    scores = calculate_opportunity_scores(
+        [candidate[0] for candidate in candidates],
+        [candidate[4] for candidate in candidates],
+        [candidate[5] for candidate in candidates]
+    )
+    
+    # One timestamp for the whole run rather than two clock reads per opportunity
+    processed_at = datetime.now().isoformat()
+    
+    for (thread, title, body, subreddit, intent, affiliate_matches), score in zip(candidates, scores):
         # Determine action type
         action_type = determine_action_type(score, intent)
         
@@ -296,7 +555,7 @@ def process_threads_to_opportunities():
             'upvotes': thread.get('upvotes', 0),
             'comments': thread.get('comments', 0),
             'created_utc': thread.get('created_utc', ''),
-            'fetched_at': thread.get('fetched_at', datetime.now().isoformat()),
+            'fetched_at': thread.get('fetched_at', processed_at),
             'intent': intent,
             'affiliate_matches': [
                 {
@@ -311,7 +570,7 @@ def process_threads_to_opportunities():
             'action_type': action_type,
             'priority': 'high' if score >= 80 else 'medium' if score >= 60 else 'low',
             'status': 'new',
-            'processed_at': datetime.now().isoformat()
+            'processed_at': processed_at
         }
         
         opportunities.append(opportunity)
@@ -324,34 +583,134 @@ def process_threads_to_opportunities():
     
     return opportunities
 
-def save_opportunities(opportunities: List[Dict[str, Any]]):
-    """Save opportunities to JSON file."""
-    existing_opportunities = []
-    
-    # Load existing data if file exists
-    if os.path.exists(OPPORTUNITIES_PATH):
-        try:
-            with open(OPPORTUNITIES_PATH, 'r') as f:
-                existing_opportunities = json.load(f)
-        except json.JSONDecodeError:
-            existing_opportunities = []
-    
-    # Get existing thread IDs
-    existing_ids = set(opp.get('thread_id') for opp in existing_opportunities)
-    
-    # Add only new opportunities
-    new_count = 0
-    for opp in opportunities:
-        if opp.get('thread_id') not in existing_ids:
-            existing_opportunities.append(opp)
-            existing_ids.add(opp.get('thread_id'))
-            new_count += 1
+def _sidecar_is_current(sidecar_path: str, data_path: str) -> bool:
+    """
+    Check that a sidecar file was written after the last change to its data file
     
-    # Save merged data
-    with open(OPPORTUNITIES_PATH, 'w') as f:
-        json.dump(existing_opportunities, f, indent=2)
+    Sidecars are always written right after the data they index, so a data
+    file that is newer (e.g. reset to [] or rewritten by the Node server)
+    means the sidecar no longer describes it.
+    """
+    if not os.path.exists(sidecar_path):
+        return False
+    return os.stat(sidecar_path).st_mtime_ns >= os.stat(data_path).st_mtime_ns
+
+def _load_opportunity_ids() -> Optional[Set[str]]:
+    """
+    Load the thread IDs already present in the opportunities file
+    
+    IDs are kept in a sidecar file (one per line) so they can be read without
+    parsing every stored opportunity. The sidecar is rebuilt from the
+    opportunities file when it is missing or older than that file.
+    
+    Returns:
+        Set of thread IDs, or None if the opportunities file is unreadable
+    """
+    if not os.path.exists(OPPORTUNITIES_PATH):
+        return set()
+    
+    if _sidecar_is_current(OPPORTUNITY_IDS_PATH, OPPORTUNITIES_PATH):
+        with open(OPPORTUNITY_IDS_PATH, 'r') as f:
+            return set(f.read().splitlines())
+    
+    try:
+        existing_ids = set(opp.get('thread_id') for opp in _load(OPPORTUNITIES_PATH))
+    except (json.JSONDecodeError, AttributeError, TypeError):
+        return None
+    
+    _write_opportunity_ids(existing_ids, 'w')
+    return existing_ids
+
+def _write_opportunity_ids(thread_ids, mode: str = 'a'):
+    """Write (or append) thread IDs to the opportunities sidecar file."""
+    with open(OPPORTUNITY_IDS_PATH, mode) as f:
+        f.writelines(f"{thread_id}\n" for thread_id in thread_ids)
+
+def _append_to_json_array(path: str, records: List[Dict[str, Any]]) -> bool:
+    """
+    Append records to the JSON array stored at path without rewriting it
+    
+    The closing bracket is located from the end of the file and the new
+    records are written in its place, so the cost depends only on the
+    number of new records. The file is only truncated after the new
+    closing bracket is written, so it never ends without one.
+    
+    Args:
+        path: Path to a file containing a JSON array
+        records: Records to append
+        
+    Returns:
+        True if the records were appended, False if the file does not end
+        with a JSON array
+    """
+    with open(path, 'rb+') as f:
+        # Walk back over trailing whitespace to the closing bracket
+        pos = f.seek(0, os.SEEK_END)
+        char = b''
+        while pos > 0:
+            pos -= 1
+            f.seek(pos)
+            char = f.read(1)
+            if not char.isspace():
+                break
+        if char != b']':
+            return False
+        closing_pos = pos
+        
+        # The previous non-whitespace character tells us if the array is empty
+        previous = b''
+        while pos > 0:
+            pos -= 1
+            f.seek(pos)
+            previous = f.read(1)
+            if not previous.isspace():
+                break
+        if not previous:
+            return False
+        
+        payload = ','.join(_dumps(record) for record in records)
+        separator = '' if previous == b'[' else ','
+        
+        f.seek(closing_pos)
+        f.write(f"{separator}{payload}]".encode('utf-8'))
+        # Drop whatever whitespace followed the old closing bracket
+        f.truncate()
+    
+    return True
+
+def _select_new_opportunities(
+    opportunities: List[Dict[str, Any]],
+    known_ids: Set[str]
+) -> List[Dict[str, Any]]:
+    """Return opportunities whose thread ID is not in known_ids, recording them there."""
+    new_opportunities = []
+    for opp in opportunities:
+        if opp.get('thread_id') not in known_ids:
+            new_opportunities.append(opp)
+            known_ids.add(opp.get('thread_id'))
+    return new_opportunities
+
+def save_opportunities(opportunities: List[Dict[str, Any]]):
+    """Save opportunities to JSON file, appending only ones not stored yet."""
+    known_ids = _load_opportunity_ids()
+    new_opportunities = _select_new_opportunities(opportunities, known_ids if known_ids is not None else set())
+    
+    appended = (
+        known_ids is not None and
+        os.path.exists(OPPORTUNITIES_PATH) and
+        (not new_opportunities or _append_to_json_array(OPPORTUNITIES_PATH, new_opportunities))
+    )
+    
+    if appended:
+        _write_opportunity_ids(opp.get('thread_id') for opp in new_opportunities)
+    else:
+        # Missing or unreadable file: start fresh with this batch
+        known_ids = set()
+        new_opportunities = _select_new_opportunities(opportunities, known_ids)
+        _dump(new_opportunities, OPPORTUNITIES_PATH)
+        _write_opportunity_ids(known_ids, 'w')
     
-    print(f"Saved {new_count} new opportunities. Total: {len(existing_opportunities)} opportunities.")
+    print(f"Saved {len(new_opportunities)} new opportunities. Total: {len(known_ids)} opportunities.")
 
 def main():
     """Main entry point for the script."""
@@ -3,17 +3,60 @@
 Reddit Scraper - No API Required
 
 This module provides functions to scrape Reddit posts without needing API access.
-It uses BeautifulSoup to parse HTML pages and extract relevant information.
+It reads the public .json listings and falls back to parsing the HTML pages with
+BeautifulSoup when a listing can't be fetched or decoded.
 """
 
+import atexit
+import functools
+import hashlib
+import itertools
 import time
 import random
 import json
+import mmap
+import multiprocessing
 import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
 import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from bs4 import BeautifulSoup, SoupStrainer
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# lxml's C parser is much faster than html.parser; use it when installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+def _dumps(obj: Any, pretty: bool = False) -> str:
+    """Serialize obj to a JSON string, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0).decode('utf-8')
+    return json.dumps(obj, indent=2) if pretty else json.dumps(obj, separators=(',', ':'))
+
+def _loads(data) -> Any:
+    """Parse a JSON str or bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _load(path: str) -> Any:
+    """Read and parse the JSON file at path."""
+    with open(path, 'rb') as f:
+        return _loads(f.read())
 
 # Constants
 USER_AGENTS = [
@@ -22,51 +65,405 @@ USER_AGENTS = [
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15'
 ]
 
+# One complete header set per user agent, built once; a session keeps the
+# same variant for its lifetime so it looks like a single browser. Only the
+# encodings urllib3 can decode here are advertised (br/zstd when brotli or
+# zstandard is installed), so compressed bodies are always readable
+_BASE_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': ACCEPT_ENCODING
+}
+_HEADER_VARIANTS = [dict(_BASE_HEADERS, **{'User-Agent': ua}) for ua in USER_AGENTS]
+
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'crawler', 'data')
 os.makedirs(DATA_DIR, exist_ok=True)
 
-RAW_DATA_PATH = os.path.join(DATA_DIR, 'threads_raw.json')
+RAW_DATA_PATH = os.path.join(DATA_DIR, 'threads_raw.jsonl')
+RAW_IDS_PATH = os.path.join(DATA_DIR, 'threads_ids.txt')
+LEGACY_RAW_DATA_PATH = os.path.join(DATA_DIR, 'threads_raw.json')
 OPPORTUNITIES_PATH = os.path.join(DATA_DIR, 'opportunities.json')
+HTTP_CACHE_DIR = os.path.join(DATA_DIR, 'http_cache')
+
+# Seconds a cached listing is reused without asking Reddit again; past this
+# the request is revalidated with the stored ETag/Last-Modified
+LISTING_TTLS = {'hot': 600, 'new': 300, 'top': 1800, 'rising': 300}
+
+# Attribute selector for post containers, built once
+_SEL_POST = {'data-testid': 'post-container'}
+
+# Everything parse_reddit_thread reads from a post, grouped by tag name so a
+# single walk over the post can pick each one out: (field, attribute, value)
+_POST_FIELD_SELECTORS = {
+    'h3': (('title', None, None),),
+    'a': (
+        ('link', 'data-click-id', 'body'),
+        ('author', 'data-testid', 'post_author_link')
+    ),
+    'div': (
+        ('votes', 'data-testid', 'post-voting-value'),
+        ('flair', 'data-testid', 'post-flairs'),
+        ('content', 'data-testid', 'post-content')
+    ),
+    'span': (('timestamp', 'data-testid', 'post_timestamp'),)
+}
+# The selectors above plus the comments span, which is matched on its text
+_POST_FIELD_COUNT = sum(len(selectors) for selectors in _POST_FIELD_SELECTORS.values()) + 1
+_VOTE_MULTIPLIERS = {'k': 1000, 'K': 1000, 'm': 1000000, 'M': 1000000}
+
+# Leading "id" field of a raw data line, as written by _dumps(thread) (or with
+# a space after the colon, as older files were). The newline is matched
+# literally because a literal prefix lets the regex engine skip ahead, while
+# a MULTILINE ^ is tried at every byte
+_RAW_ID_RE = re.compile(rb'\{"id": ?"([^"\\\n]*)"')
+_RAW_LINE_ID_RE = re.compile(rb'\n\{"id": ?"([^"\\\n]*)"')
+
+# Only post containers are built into the tree; nav, sidebars and scripts are skipped
+POST_STRAINER = SoupStrainer('div', attrs=_SEL_POST)
+
+# Per-host politeness limits as (requests per second, burst size)
+HOST_RATE_LIMITS = {'www.reddit.com': (0.25, 1)}
+DEFAULT_RATE_LIMIT = (0.25, 1)
+
+class HostTokenBucket:
+    """
+    Token bucket limiting the request rate to a single host
+    
+    Tokens refill at `rate` per second up to `capacity`. A caller that finds
+    the bucket empty reserves the next token and sleeps until it is due, so
+    concurrent callers are staggered instead of all waking at once.
+    """
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Take one token, blocking until one is available."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        
+        if wait > 0:
+            time.sleep(wait)
+    
+    def defer(self, seconds: float):
+        """Hold back every caller until at least `seconds` from now."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+# Buckets shared by all fetch threads, keyed by host
+_HOST_BUCKETS: Dict[str, HostTokenBucket] = {}
+_HOST_BUCKETS_GUARD = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _session() -> requests.Session:
+    """
+    Return the shared HTTP session, creating it on first use
+    
+    Every page is fetched from the same host, so keeping connections alive
+    avoids a fresh TCP and TLS handshake per request. The pool is sized to
+    cover the fetch threads in fetch_multiple_subreddits; retries stay in
+    make_request so the adapter doesn't retry on its own. The user agent is
+    picked once per session rather than per request.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(random.choice(_HEADER_VARIANTS))
+    atexit.register(session.close)
+    return session
+
+def _rotate_session():
+    """
+    Start a fresh session, with a newly picked user agent, for later requests
+    
+    The old session isn't closed here since other fetch threads may still be
+    using it; it is closed at exit.
+    """
+    _session.cache_clear()
 
-def get_random_user_agent() -> str:
-    """Return a random user agent from the list."""
-    return random.choice(USER_AGENTS)
+def close_session():
+    """Close the shared HTTP session and its pooled connections, if open."""
+    if _session.cache_info().currsize:
+        _session().close()
+        _session.cache_clear()
 
-def make_request(url: str, retries: int = 3, delay: int = 5) -> Optional[str]:
+@functools.lru_cache(maxsize=1)
+def _parse_pool() -> ProcessPoolExecutor:
     """
-    Make HTTP request with retry logic and random user agents
+    Return the process pool used for HTML parsing, creating it on first use
+    
+    BeautifulSoup parsing is CPU-bound and holds the GIL, so HTML pages are
+    parsed in worker processes while the fetch threads keep downloading.
+    Workers are spawned rather than forked since the pool is started from a
+    multithreaded process.
+    """
+    pool = ProcessPoolExecutor(
+        max_workers=min(4, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context('spawn')
+    )
+    atexit.register(pool.shutdown)
+    return pool
+
+def wait_for_host(url: str):
+    """
+    Block until the URL's host may be requested again
+    
+    Requests to the same host are rate limited by its token bucket, no
+    matter which thread issues them; requests to different hosts don't
+    wait on each other.
+    
+    Args:
+        url: The URL about to be requested
+    """
+    _host_bucket(url).acquire()
+
+def _host_bucket(url: str) -> HostTokenBucket:
+    """Return the token bucket for the URL's host, creating it on first use."""
+    host = urlparse(url).netloc
+    with _HOST_BUCKETS_GUARD:
+        bucket = _HOST_BUCKETS.get(host)
+        if bucket is None:
+            bucket = _HOST_BUCKETS[host] = HostTokenBucket(*HOST_RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT))
+    return bucket
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+def _cache_path(url: str) -> str:
+    """Return the path of the cached response file for a URL."""
+    name = hashlib.blake2b(url.encode('utf-8'), digest_size=8).hexdigest()
+    return os.path.join(HTTP_CACHE_DIR, f"{name}.json")
+
+def _load_cached_response(url: str) -> Optional[Dict[str, Any]]:
+    """Load the cached response for a URL, or None if there isn't a usable one."""
+    try:
+        entry = _load(_cache_path(url))
+    except (OSError, ValueError):
+        return None
+    return entry if isinstance(entry, dict) and entry.get('url') == url else None
+
+def _store_cached_response(url: str, body: str, etag: Optional[str], last_modified: Optional[str]):
+    """Write a response to the cache, replacing any previous entry for the URL."""
+    os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+    path = _cache_path(url)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_dumps({
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time(),
+            'body': body
+        }).encode('utf-8'))
+    os.replace(tmp_path, path)
+
+def make_request(url: str, retries: int = 3, delay: float = 1, ttl: float = 0) -> Optional[str]:
+    """
+    Make HTTP request with retry logic over the shared session
+    
+    Responses are cached on disk by URL. A cached body younger than ttl is
+    returned without touching the network; older ones are revalidated with
+    If-None-Match/If-Modified-Since and reused on a 304.
+    
+    Failed attempts back off exponentially with jitter. A 429 with a
+    Retry-After header holds back all requests to the host for that long
+    and doesn't use up an attempt; other 4xx responses aren't retried.
     
     Args:
         url: The URL to request
         retries: Number of retry attempts
-        delay: Base delay between retries (will be randomized)
+        delay: Base delay between retries, doubled after each failure
+        ttl: Seconds a cached response can be reused without revalidating
         
     Returns:
-        HTML content as string or None if all retries failed
+        Response body as string or None if all retries failed
     """
-    headers = {
-        'User-Agent': get_random_user_agent(),
-        'Accept': 'text/html,application/xhtml+xml,application/xml',
-        'Accept-Language': 'en-US,en;q=0.9'
-    }
+    cached = _load_cached_response(url)
+    if cached and time.time() - cached.get('fetched_at', 0) < ttl:
+        print(f"Using cached response for {url}")
+        return cached['body']
+    
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
     
-    for attempt in range(retries):
+    attempt = 0
+    throttled = 0
+    while attempt < retries:
+        wait_for_host(url)
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = _session().get(url, headers=headers, timeout=10)
             if response.status_code == 200:
+                _store_cached_response(
+                    url,
+                    response.text,
+                    response.headers.get('ETag'),
+                    response.headers.get('Last-Modified')
+                )
                 return response.text
+            elif response.status_code == 304 and cached:
+                # Unchanged upstream; restart the TTL on the cached copy
+                _store_cached_response(url, cached['body'], cached.get('etag'), cached.get('last_modified'))
+                return cached['body']
             else:
-                print(f"Got status code {response.status_code} for {url}")
+                status = response.status_code
+                print(f"Got status code {status} for {url}")
+                if status in (429, 503):
+                    # Throttled; retry as a different-looking client
+                    _rotate_session()
+                
+                retry_after = _retry_after_seconds(response.headers.get('Retry-After')) if status == 429 else None
+                if retry_after is not None and throttled < retries:
+                    # The server said when to come back; the host's bucket makes
+                    # every fetch thread wait, and this doesn't count as an attempt
+                    throttled += 1
+                    wait = min(retry_after, 300)
+                    print(f"Rate limited; waiting {wait:.2f} seconds as requested")
+                    _host_bucket(url).defer(wait)
+                    continue
+                
+                if 400 <= status < 500 and status not in (408, 429):
+                    # Not found, forbidden, etc.; retrying won't help
+                    return None
         except Exception as e:
             print(f"Error fetching {url}: {str(e)}")
         
-        # Add randomized delay before retry
-        sleep_time = delay + random.uniform(1, 3)
-        print(f"Retrying in {sleep_time:.2f} seconds... (Attempt {attempt + 1}/{retries})")
+        attempt += 1
+        if attempt >= retries:
+            break
+        
+        # Exponential backoff with jitter before the next attempt
+        sleep_time = min(60, delay * 2 ** (attempt - 1)) + random.random()
+        print(f"Retrying in {sleep_time:.2f} seconds... (Attempt {attempt}/{retries})")
         time.sleep(sleep_time)
     
     return None
 
+def parse_reddit_listing(payload: str, subreddit: str) -> List[Dict[str, Any]]:
+    """
+    Parse a Reddit .json listing to extract thread data
+    
+    The listing already carries typed fields, so nothing has to be scraped
+    out of rendered markup. Threads use the same shape as parse_reddit_thread.
+    
+    Args:
+        payload: JSON body of a /r/<subreddit>/<mode>/.json response
+        subreddit: Name of the subreddit
+        
+    Returns:
+        List of thread dictionaries with extracted data
+        
+    Raises:
+        ValueError: If the payload isn't a Reddit listing
+    """
+    try:
+        children = _loads(payload)['data']['children']
+    except (TypeError, KeyError) as e:
+        raise ValueError(f"Not a Reddit listing: {str(e)}")
+    
+    threads = []
+    fetched_at = datetime.now().isoformat()
+    
+    for child in children:
+        try:
+            post = child['data']
+            permalink = post.get('permalink')
+            if not permalink:
+                continue
+            
+            created = post.get('created_utc')
+            timestamp = datetime.fromtimestamp(created).isoformat() if created else fetched_at
+            
+            author = post.get('author')
+            
+            threads.append({
+                'id': post.get('id'),
+                'title': (post.get('title') or "No Title").strip(),
+                'url': f"https://www.reddit.com{permalink}",
+                'author': f"u/{author}" if author else "Unknown",
+                'subreddit': subreddit,
+                'body': (post.get('selftext') or "").strip(),
+                'upvotes': int(post.get('ups') or 0),
+                'comments': int(post.get('num_comments') or 0),
+                'flair': post.get('link_flair_text'),
+                'created_utc': timestamp,
+                'fetched_at': fetched_at
+            })
+            
+        except Exception as e:
+            print(f"Error parsing thread: {str(e)}")
+            continue
+    
+    return threads
+
+def _parse_vote_count(text: str) -> int:
+    """Convert a displayed vote count such as "15", "1.2k" or "3M" to an int."""
+    multiplier = _VOTE_MULTIPLIERS.get(text[-1:])
+    if multiplier:
+        return int(float(text[:-1]) * multiplier)
+    return int(text) if text.isdigit() else 0
+
+def _select_post_elements(post) -> Dict[str, Any]:
+    """
+    Find the elements parse_reddit_thread needs in one walk over a post
+    
+    Equivalent to a find() per field, each returning the first match in
+    document order, but the post's subtree is traversed once instead of
+    once per field. The walk stops as soon as every field has been found.
+    
+    Args:
+        post: A post-container tag
+        
+    Returns:
+        Dict of field name to element; fields that weren't found are absent
+    """
+    elements = {}
+    for element in post.descendants:
+        selectors = _POST_FIELD_SELECTORS.get(element.name)
+        if selectors is None:
+            continue
+        
+        for field, attr, value in selectors:
+            if field not in elements and (attr is None or element.get(attr) == value):
+                elements[field] = element
+        
+        # The comments count is the first span whose only text mentions comments
+        if element.name == 'span' and 'comments' not in elements:
+            text = element.string
+            if text is not None and 'comments' in text.lower():
+                elements['comments'] = element
+        
+        if len(elements) == _POST_FIELD_COUNT:
+            break
+    
+    return elements
+
 def parse_reddit_thread(html: str, subreddit: str) -> List[Dict[str, Any]]:
     """
     Parse Reddit HTML to extract thread data
@@ -78,20 +475,25 @@ def parse_reddit_thread(html: str, subreddit: str) -> List[Dict[str, Any]]:
     Returns:
         List of thread dictionaries with extracted data
     """
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=POST_STRAINER)
     threads = []
     
-    # Find all posts in the feed
-    posts = soup.find_all('div', {'data-testid': 'post-container'})
+    # Every post on the page was fetched at the same moment; format it once
+    now_iso = datetime.now().isoformat()
+    
+    # The strainer leaves only post containers, all at the top of the tree, so
+    # there's no need to walk into each post's subtree looking for more
+    posts = soup.find_all('div', _SEL_POST, recursive=False)
     
     for post in posts:
         try:
             # Extract post data
-            title_element = post.find('h3')
+            elements = _select_post_elements(post)
+            title_element = elements.get('title')
             title = title_element.text.strip() if title_element else "No Title"
             
             # Get post URL
-            link_element = post.find('a', {'data-click-id': 'body'})
+            link_element = elements.get('link')
             url = f"https://www.reddit.com{link_element['href']}" if link_element and 'href' in link_element.attrs else None
             
             if url is None:
@@ -101,39 +503,31 @@ def parse_reddit_thread(html: str, subreddit: str) -> List[Dict[str, Any]]:
             post_id = url.split('comments/')[1].split('/')[0] if '/comments/' in url else None
             
             # Get author
-            author_element = post.find('a', {'data-testid': 'post_author_link'})
+            author_element = elements.get('author')
             author = author_element.text.strip() if author_element else "Unknown"
             
             # Get upvotes
-            upvote_element = post.find('div', {'data-testid': 'post-voting-value'})
-            upvotes_text = upvote_element.text.strip() if upvote_element else "0"
-            
-            # Handle k/m formatting
-            if 'k' in upvotes_text.lower():
-                upvotes = int(float(upvotes_text.lower().replace('k', '')) * 1000)
-            elif 'm' in upvotes_text.lower():
-                upvotes = int(float(upvotes_text.lower().replace('m', '')) * 1000000)
-            else:
-                upvotes = int(upvotes_text) if upvotes_text.isdigit() else 0
+            upvote_element = elements.get('votes')
+            upvotes = _parse_vote_count(upvote_element.text.strip() if upvote_element else "0")
             
             # Get comments count
-            comments_element = post.find('span', string=lambda text: text and 'comments' in text.lower())
-            comments_text = comments_element.text.strip() if comments_element else "0 comments"
-            comments_count = int(comments_text.split()[0]) if comments_text.split()[0].isdigit() else 0
+            comments_element = elements.get('comments')
+            comments_text = comments_element.text.split()[0].replace(',', '') if comments_element else "0"
+            comments_count = int(comments_text) if comments_text.isdigit() else 0
             
             # Get flair if any
-            flair_element = post.find('div', {'data-testid': 'post-flairs'})
+            flair_element = elements.get('flair')
             flair = flair_element.text.strip() if flair_element else None
             
             # Get timestamp (approximation from relative time)
-            time_element = post.find('span', {'data-testid': 'post_timestamp'})
+            time_element = elements.get('timestamp')
             time_text = time_element.text.strip() if time_element else ""
             
             # Convert relative time to timestamp
-            timestamp = datetime.now().isoformat()  # Default to now
+            timestamp = now_iso  # Default to now
             
             # Get post body preview (if available)
-            body_element = post.find('div', {'data-testid': 'post-content'})
+            body_element = elements.get('content')
             body = ""
             if body_element:
                 paragraphs = body_element.find_all('p')
@@ -156,7 +550,7 @@ def parse_reddit_thread(html: str, subreddit: str) -> List[Dict[str, Any]]:
                 'comments': comments_count,
                 'flair': flair,
                 'created_utc': timestamp,
-                'fetched_at': datetime.now().isoformat()
+                'fetched_at': now_iso
             }
             
             threads.append(thread)
@@ -182,52 +576,222 @@ def fetch_subreddit_threads(subreddit: str, sort_mode: str = 'hot') -> List[Dict
     if sort_mode not in valid_modes:
         sort_mode = 'hot'  # Default to hot
     
+    # The JSON listing is smaller and already structured; prefer it
+    json_url = f'https://www.reddit.com/r/{subreddit}/{sort_mode}/.json?limit=100'
+    print(f"Fetching threads from {json_url}")
+    
+    ttl = LISTING_TTLS.get(sort_mode, 0)
+    payload = make_request(json_url, ttl=ttl)
+    if payload:
+        try:
+            return parse_reddit_listing(payload, f"r/{subreddit}")
+        except ValueError as e:
+            print(f"Could not parse listing from {json_url}: {str(e)}")
+    
     url = f'https://www.reddit.com/r/{subreddit}/{sort_mode}/'
-    print(f"Fetching threads from {url}")
+    print(f"Falling back to {url}")
     
-    html = make_request(url)
+    html = make_request(url, ttl=ttl)
     if not html:
         print(f"Failed to fetch {url}")
         return []
     
-    threads = parse_reddit_thread(html, f"r/{subreddit}")
+    try:
+        threads = _parse_pool().submit(parse_reddit_thread, html, f"r/{subreddit}").result()
+    except (OSError, RuntimeError) as e:
+        # No usable worker processes (e.g. a sandbox without fork/spawn); parse here
+        print(f"Parsing in-process: {str(e)}")
+        threads = parse_reddit_thread(html, f"r/{subreddit}")
     return threads
 
-def save_raw_threads(threads: List[Dict[str, Any]]):
-    """Save threads to raw data file, appending to existing data."""
-    existing_threads = []
+def _iter_raw_threads() -> Iterator[Dict[str, Any]]:
+    """Yield the threads stored in the raw data file, skipping damaged lines."""
+    with open(RAW_DATA_PATH, 'rb') as f:
+        for line in f:
+            try:
+                yield _loads(line)
+            except ValueError:
+                continue
+
+def _append_raw_threads(threads: List[Dict[str, Any]]):
+    """Append threads to the raw data file and their IDs to the sidecar file."""
+    lines = [_dumps(thread) + '\n' for thread in threads]
     
-    # Load existing data if file exists
-    if os.path.exists(RAW_DATA_PATH):
-        try:
-            with open(RAW_DATA_PATH, 'r') as f:
-                existing_threads = json.load(f)
-        except json.JSONDecodeError:
-            # If file is corrupted, start fresh
-            existing_threads = []
+    with open(RAW_DATA_PATH, 'a+b') as f:
+        # An interrupted append can leave a partial last line; start on a fresh one
+        end = f.seek(0, os.SEEK_END)
+        if end:
+            f.seek(end - 1)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+        f.write(''.join(lines).encode('utf-8'))
+    
+    with open(RAW_IDS_PATH, 'a') as f:
+        f.writelines(f"{thread['id']}\n" for thread in threads)
+
+def _migrate_legacy_raw_threads():
+    """
+    Convert a JSON-array threads_raw.json into the JSON Lines raw data file
+    
+    Runs once: only when the old file exists and the new one doesn't. The old
+    file is removed after a successful conversion and left in place if it
+    can't be parsed.
+    """
+    if os.path.exists(RAW_DATA_PATH) or not os.path.exists(LEGACY_RAW_DATA_PATH):
+        return
+    
+    try:
+        legacy_threads = _load(LEGACY_RAW_DATA_PATH)
+    except ValueError:
+        print(f"Could not parse {LEGACY_RAW_DATA_PATH}; starting a new raw data file")
+        return
     
-    # Get IDs of existing threads
-    existing_ids = set(thread.get('id') for thread in existing_threads)
+    # Keep the first copy of each thread, as the old merge did
+    seen_ids = set()
+    threads = []
+    for thread in legacy_threads:
+        thread_id = thread.get('id')
+        if thread_id and thread_id not in seen_ids:
+            seen_ids.add(thread_id)
+            threads.append(thread)
+    
+    if os.path.exists(RAW_IDS_PATH):
+        os.remove(RAW_IDS_PATH)
+    _append_raw_threads(threads)
+    os.remove(LEGACY_RAW_DATA_PATH)
+    print(f"Migrated {len(threads)} threads to {RAW_DATA_PATH}")
+
+def _scan_raw_thread_ids() -> Set[str]:
+    """
+    Collect thread IDs from the raw data file without decoding every thread
+    
+    Each line starts with the thread's "id" field and ends with the object's
+    closing brace, so one regex pass over the memory-mapped file picks the
+    IDs out. If any line doesn't have that shape (hand-edited, or cut short
+    by an interrupted append), fall back to decoding line by line so that
+    a damaged line's ID isn't counted as stored.
+    """
+    with open(RAW_DATA_PATH, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return set()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            first = _RAW_ID_RE.match(data)
+            ids = ([first.group(1)] if first else []) + _RAW_LINE_ID_RE.findall(data)
+            # Count lines, and lines ending in '}', a block at a time rather
+            # than copying the whole file; each block also sees the first byte
+            # of the next so a '}\n' split across blocks is still counted
+            lines = closed = 0
+            for i in range(0, len(data), 1 << 20):
+                lines += data[i:i + (1 << 20)].count(b'\n')
+                closed += data[i:i + (1 << 20) + 1].count(b'}\n')
+            lines += data[-1:] != b'\n'
+            closed += data[-1:] == b'}'
+    
+    if len(ids) == lines == closed:
+        return set(thread_id.decode('utf-8') for thread_id in ids)
+    
+    existing_ids = set(thread.get('id') for thread in _iter_raw_threads())
+    existing_ids.discard(None)
+    return existing_ids
+
+def _sidecar_is_current(sidecar_path: str, data_path: str) -> bool:
+    """
+    Check that a sidecar file was written after the last change to its data file
     
-    # Add only new threads
+    Sidecars are always written right after the data they index, so a data
+    file that is newer (reset, replaced or restored by something else) means
+    the sidecar no longer describes it.
+    """
+    if not os.path.exists(sidecar_path):
+        return False
+    return os.stat(sidecar_path).st_mtime_ns >= os.stat(data_path).st_mtime_ns
+
+def _find_stored_thread_ids(thread_ids: Set[str]) -> Tuple[Set[str], int]:
+    """
+    Check which of the given thread IDs are already in the raw data file
+    
+    IDs are kept in a sidecar file (one per line) so they can be read without
+    parsing every stored thread. The sidecar is streamed and only matches
+    are kept, so memory grows with the batch rather than with the corpus.
+    The sidecar is rebuilt from the raw data file when it is missing or
+    older than the raw data file, and removed when the raw data file is gone.
+    
+    Args:
+        thread_ids: IDs of the threads about to be saved
+        
+    Returns:
+        The IDs that are already stored, and the number of stored threads
+    """
+    if not os.path.exists(RAW_DATA_PATH):
+        # IDs left over from a deleted raw data file would hide those threads
+        if os.path.exists(RAW_IDS_PATH):
+            os.remove(RAW_IDS_PATH)
+        return set(), 0
+    
+    if not _sidecar_is_current(RAW_IDS_PATH, RAW_DATA_PATH):
+        stored_ids = _scan_raw_thread_ids()
+        with open(RAW_IDS_PATH, 'w') as f:
+            f.writelines(f"{thread_id}\n" for thread_id in stored_ids)
+        return thread_ids & stored_ids, len(stored_ids)
+    
+    found = set()
+    stored_count = 0
+    with open(RAW_IDS_PATH, 'r') as f:
+        for line in f:
+            stored_count += 1
+            thread_id = line.rstrip('\n')
+            if thread_id in thread_ids:
+                found.add(thread_id)
+    return found, stored_count
+
+def save_raw_threads(threads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Save threads to the raw data file, appending only ones not already stored
+    
+    Threads are stored one JSON object per line, so saving k new threads
+    costs O(k) no matter how large the file has grown.
+    
+    Args:
+        threads: Scraped threads, possibly including already-stored ones
+        
+    Returns:
+        The threads that were newly added
+    """
+    _migrate_legacy_raw_threads()
+    batch_ids = set(thread.get('id') for thread in threads)
+    batch_ids.discard(None)
+    seen_ids, stored_count = _find_stored_thread_ids(batch_ids)
+    
+    # Add only new threads; the same thread can show up under several sort modes
+    new_threads = []
     for thread in threads:
-        if thread.get('id') not in existing_ids:
-            existing_threads.append(thread)
+        thread_id = thread.get('id')
+        if thread_id and thread_id not in seen_ids:
+            seen_ids.add(thread_id)
+            new_threads.append(thread)
     
-    # Save merged data
-    with open(RAW_DATA_PATH, 'w') as f:
-        json.dump(existing_threads, f, indent=2)
+    if new_threads:
+        _append_raw_threads(new_threads)
     
-    print(f"Saved {len(threads)} new threads. Total: {len(existing_threads)} threads.")
-    return existing_threads
+    print(f"Saved {len(new_threads)} new threads. Total: {stored_count + len(new_threads)} threads.")
+    return new_threads
 
-def fetch_multiple_subreddits(subreddits: List[str], sort_modes: List[str] = None) -> List[Dict[str, Any]]:
+def fetch_multiple_subreddits(
+    subreddits: List[str],
+    sort_modes: List[str] = None,
+    max_workers: int = 4
+) -> List[Dict[str, Any]]:
     """
     Fetch threads from multiple subreddits with different sort modes
     
+    Pages are fetched concurrently; wait_for_host keeps requests to the same
+    host spaced out, so the concurrency overlaps waiting and parsing rather
+    than increasing the request rate.
+    
     Args:
         subreddits: List of subreddit names without r/ prefix
         sort_modes: List of sort modes to use
+        max_workers: Maximum number of pages fetched at once
         
     Returns:
         Combined list of threads
@@ -235,20 +799,19 @@ def fetch_multiple_subreddits(subreddits: List[str], sort_modes: List[str] = Non
     if sort_modes is None:
         sort_modes = ['hot', 'new', 'top']
     
-    all_threads = []
+    # One flat queue of distinct pages, fetched in shuffled order so the same
+    # subreddit isn't always first in line for the rate limiter
+    tasks = list(dict.fromkeys((subreddit, mode) for subreddit in subreddits for mode in sort_modes))
+    fetch_order = random.sample(tasks, len(tasks))
     
-    for subreddit in subreddits:
-        for mode in sort_modes:
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for subreddit, mode in fetch_order:
             print(f"Fetching r/{subreddit} - {mode}")
-            threads = fetch_subreddit_threads(subreddit, mode)
-            all_threads.extend(threads)
-            
-            # Add delay between requests to avoid rate limiting
-            delay = random.uniform(2, 5)
-            print(f"Waiting {delay:.2f} seconds before next request...")
-            time.sleep(delay)
-    
-    return all_threads
+            futures[(subreddit, mode)] = executor.submit(fetch_subreddit_threads, subreddit, mode)
+        
+        # Combine in subreddit/mode order so output order stays deterministic
+        return list(itertools.chain.from_iterable(futures[task].result() for task in tasks))
 
 def main():
     """Main entry point for the script."""
@@ -260,6 +823,7 @@ def main():
     
     # Save raw data
     save_raw_threads(all_threads)
+    close_session()
     
     print(f"Completed scraping {len(all_threads)} threads from {len(subreddits)} subreddits.")
 
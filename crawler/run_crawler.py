@@ -16,15 +16,37 @@ import json
 import argparse
 from datetime import datetime, timedelta
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Add the project root to the Python path so we can import the crawler modules
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
 # Using direct imports since we're already in the crawler directory
-from reddit_scraper import fetch_multiple_subreddits, save_raw_threads
+from reddit_scraper import fetch_multiple_subreddits, save_raw_threads, close_session
 from keyword_matcher import process_threads_to_opportunities
 from data_storage import sync_opportunities_from_file, get_top_opportunities
 
+def _dumps(obj, pretty: bool = False) -> str:
+    """Serialize obj to a JSON string, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0).decode('utf-8')
+    return json.dumps(obj, indent=2) if pretty else json.dumps(obj, separators=(',', ':'))
+
+def _loads(data):
+    """Parse a JSON str or bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _load(path: str):
+    """Read and parse the JSON file at path."""
+    with open(path, 'rb') as f:
+        return _loads(f.read())
+
 # Constants
 DATA_DIR = os.path.join(project_root, 'crawler', 'data')
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -32,6 +54,9 @@ os.makedirs(DATA_DIR, exist_ok=True)
 LOG_FILE = os.path.join(DATA_DIR, 'crawler_log.txt')
 STATUS_FILE = os.path.join(DATA_DIR, 'status.json')
 
+# Log file handle held open for the duration of a crawler run
+_log_file = None
+
 def log_message(message: str):
     """Log a message to the log file and console."""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -39,8 +64,11 @@ def log_message(message: str):
     
     print(log_line)
     
-    with open(LOG_FILE, 'a') as f:
-        f.write(log_line + '\n')
+    if _log_file is not None:
+        _log_file.write(log_line + '\n')
+    else:
+        with open(LOG_FILE, 'a') as f:
+            f.write(log_line + '\n')
 
 def update_status(status: str, details: dict = None):
     """Update the crawler status file."""
@@ -50,8 +78,11 @@ def update_status(status: str, details: dict = None):
         'details': details or {}
     }
     
-    with open(STATUS_FILE, 'w') as f:
-        json.dump(status_data, f, indent=2)
+    # Write to a temporary file and swap it in, so readers never see a partial file
+    tmp_path = STATUS_FILE + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_dumps(status_data, pretty=True).encode('utf-8'))
+    os.replace(tmp_path, STATUS_FILE)
 
 def check_last_run() -> bool:
     """
@@ -62,8 +93,7 @@ def check_last_run() -> bool:
     """
     try:
         if os.path.exists(STATUS_FILE):
-            with open(STATUS_FILE, 'r') as f:
-                status_data = json.load(f)
+            status_data = _load(STATUS_FILE)
             
             last_updated = datetime.fromisoformat(status_data.get('last_updated', '2000-01-01T00:00:00'))
             time_since_last = datetime.now() - last_updated
@@ -83,10 +113,15 @@ def run_full_crawler(force: bool = False, subreddits: list = None):
         force: Force run even if it hasn't been long enough since last run
         subreddits: List of subreddits to scrape (without r/ prefix)
     """
+    global _log_file
+    
     if not force and not check_last_run():
         log_message("Skipping crawler run - not enough time since last run")
         return False
     
+    # Keep the log open for the whole run instead of reopening it per line
+    _log_file = open(LOG_FILE, 'a', buffering=8192)
+    
     try:
         start_time = time.time()
         log_message("Starting Reddit opportunity crawler")
@@ -102,12 +137,14 @@ def run_full_crawler(force: bool = False, subreddits: list = None):
         # Step 1: Scrape Reddit
         log_message(f"Scraping {len(subreddits)} subreddits: {', '.join(subreddits)}")
         threads = fetch_multiple_subreddits(subreddits, ['hot', 'new'])
+        close_session()
         log_message(f"Found {len(threads)} threads")
-        save_raw_threads(threads)
+        new_threads = save_raw_threads(threads)
+        log_message(f"Saved {len(new_threads)} new threads")
         
-        # Step 2: Process opportunities
+        # Step 2: Process opportunities (only threads not seen in earlier runs)
         log_message("Processing threads to find affiliate opportunities")
-        opportunities = process_threads_to_opportunities()
+        opportunities = process_threads_to_opportunities(new_threads=new_threads)
         log_message(f"Identified {len(opportunities)} potential opportunities")
         
         # Step 3: Sync to database
@@ -127,6 +164,7 @@ def run_full_crawler(force: bool = False, subreddits: list = None):
         
         update_status('completed', {
             'threads_found': len(threads),
+            'new_threads': len(new_threads),
             'opportunities_found': len(opportunities),
             'new_opportunities': new_count,
             'elapsed_seconds': elapsed,
@@ -139,6 +177,10 @@ def run_full_crawler(force: bool = False, subreddits: list = None):
         log_message(f"Error in crawler: {str(e)}")
         update_status('error', {'error': str(e)})
         return False
+        
+    finally:
+        _log_file.close()
+        _log_file = None
 
 def main():
     """Main entry point with argument parsing."""
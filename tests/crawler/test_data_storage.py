@@ -0,0 +1,175 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'crawler'))
+
+import data_storage
+
+# The opportunities schema as created before composite score indexes
+SCHEMA_V1 = '''
+    CREATE TABLE opportunities (
+        thread_id TEXT PRIMARY KEY,
+        status TEXT,
+        subreddit TEXT,
+        action_type TEXT,
+        opportunity_score REAL,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX idx_opportunities_status ON opportunities (status);
+    CREATE INDEX idx_opportunities_subreddit ON opportunities (subreddit);
+    CREATE INDEX idx_opportunities_score ON opportunities (opportunity_score DESC);
+    PRAGMA user_version = 1;
+'''
+
+
+def opportunity(thread_id, score, status='new', subreddit='r/SEO', action_type='comment'):
+    return {
+        'thread_id': thread_id,
+        'opportunity_score': score,
+        'status': status,
+        'subreddit': subreddit,
+        'action_type': action_type,
+    }
+
+
+class DataStorageTestCase(unittest.TestCase):
+    """Point the storage module's files at a temporary directory."""
+
+    PATHS = {
+        'DATA_DIR': '',
+        'OPPORTUNITIES_PATH': 'opportunities.json',
+        'DB_PATH': 'affiliate_data.json',
+        'SQLITE_PATH': 'opportunities.db',
+    }
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+        for name, filename in self.PATHS.items():
+            self.addCleanup(setattr, data_storage, name, getattr(data_storage, name))
+            setattr(data_storage, name, os.path.join(self.data_dir, filename))
+
+        data_storage._db.cache_clear()
+        self.addCleanup(data_storage._db.cache_clear)
+        self.addCleanup(self.close_db)
+
+    def close_db(self):
+        if data_storage._db.cache_info().currsize:
+            data_storage._db().close()
+
+    def index_names(self, conn):
+        return {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'"
+        )}
+
+
+class InitDbTest(DataStorageTestCase):
+    def test_creates_current_schema(self):
+        conn = data_storage._db()
+        self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], data_storage.SCHEMA_VERSION)
+        self.assertEqual(self.index_names(conn), {
+            'idx_opportunities_score',
+            'idx_opportunities_status_score',
+            'idx_opportunities_subreddit_score',
+        })
+
+    def test_upgrades_version_1_schema(self):
+        conn = sqlite3.connect(data_storage.SQLITE_PATH)
+        conn.executescript(SCHEMA_V1)
+        conn.execute(
+            'INSERT INTO opportunities VALUES (?, ?, ?, ?, ?, ?)',
+            ('a', 'new', 'r/SEO', 'comment', 50.0, data_storage._dumps(opportunity('a', 50.0)))
+        )
+        conn.commit()
+        conn.close()
+
+        conn = data_storage._db()
+        self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], 2)
+        self.assertEqual(self.index_names(conn), {
+            'idx_opportunities_score',
+            'idx_opportunities_status_score',
+            'idx_opportunities_subreddit_score',
+        })
+        self.assertEqual([opp['thread_id'] for opp in data_storage.get_opportunities()], ['a'])
+
+    def test_current_schema_is_left_alone(self):
+        data_storage._db()
+        self.close_db()
+        data_storage._db.cache_clear()
+
+        conn = data_storage._db()
+        self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], 2)
+
+    def test_migrates_legacy_tinydb_opportunities(self):
+        from tinydb import TinyDB
+        legacy_db = TinyDB(data_storage.DB_PATH)
+        legacy_db.table('opportunities').insert_multiple([opportunity('a', 10.0), opportunity('b', 20.0)])
+        legacy_db.close()
+
+        self.assertEqual([opp['thread_id'] for opp in data_storage.get_opportunities()], ['b', 'a'])
+
+
+class QueryPlanTest(DataStorageTestCase):
+    def query_plan(self, **filters):
+        """Return the plan details of the query get_opportunities runs."""
+        conn = data_storage._db()
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            data_storage.get_opportunities(**filters)
+        finally:
+            conn.set_trace_callback(None)
+        return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + statements[-1])]
+
+    def test_filtered_top_n_reads_in_score_order(self):
+        for filters, index in [
+            ({'status': 'new'}, 'idx_opportunities_status_score'),
+            ({'subreddit': 'r/SEO'}, 'idx_opportunities_subreddit_score'),
+            ({}, 'idx_opportunities_score'),
+        ]:
+            with self.subTest(filters=filters):
+                plan = self.query_plan(limit=10, **filters)
+                self.assertTrue(any(index in detail for detail in plan), plan)
+                self.assertFalse(any('TEMP B-TREE' in detail for detail in plan), plan)
+
+
+class SaveToDbTest(DataStorageTestCase):
+    def test_counts_only_new_threads(self):
+        self.assertEqual(data_storage.save_to_db([opportunity('a', 10.0), opportunity('b', 20.0)]), 2)
+        self.assertEqual(data_storage.save_to_db([opportunity('b', 30.0), opportunity('c', 5.0), opportunity('c', 6.0)]), 1)
+
+        scores = {opp['thread_id']: opp['opportunity_score'] for opp in data_storage.get_opportunities()}
+        self.assertEqual(scores, {'a': 10.0, 'b': 30.0, 'c': 6.0})
+
+    def test_filters_and_orders_by_score(self):
+        data_storage.save_to_db([
+            opportunity('a', 10.0),
+            opportunity('b', 30.0, status='queued'),
+            opportunity('c', 20.0, subreddit='r/Blogging'),
+            opportunity('d', 0.0),
+        ])
+
+        def ids(**filters):
+            return [opp['thread_id'] for opp in data_storage.get_opportunities(**filters)]
+
+        self.assertEqual(ids(), ['b', 'c', 'a', 'd'])
+        self.assertEqual(ids(status='new'), ['c', 'a', 'd'])
+        self.assertEqual(ids(subreddit='r/Blogging'), ['c'])
+        self.assertEqual(ids(min_score=0), ['b', 'c', 'a', 'd'])
+        self.assertEqual(ids(min_score=15), ['b', 'c'])
+        self.assertEqual(ids(status='', limit=2), ['b', 'c'])
+
+    def test_status_update_is_stored_in_record(self):
+        data_storage.save_to_db([opportunity('a', 10.0)])
+        self.assertTrue(data_storage.update_opportunity_status('a', 'processed'))
+        self.assertFalse(data_storage.update_opportunity_status('missing', 'processed'))
+        self.assertEqual(data_storage.get_opportunities(status='processed')[0]['status'], 'processed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,230 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'crawler'))
+
+import keyword_matcher
+
+MATCHING_THREAD = {
+    'id': 'abc123',
+    'title': 'Looking for the best gaming mouse',
+    'body': 'Any recommendations?',
+    'subreddit': 'r/GamingMouse',
+    'url': 'https://www.reddit.com/r/GamingMouse/comments/abc123/',
+    'upvotes': 10,
+    'comments': 3,
+    'created_utc': '2025-01-01T00:00:00',
+}
+
+
+class TempDirTestCase(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+    def write(self, filename, content):
+        path = os.path.join(self.data_dir, filename)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def read(self, filename):
+        with open(os.path.join(self.data_dir, filename), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def set_mtime_ns(self, filename, mtime_ns):
+        os.utime(os.path.join(self.data_dir, filename), ns=(mtime_ns, mtime_ns))
+
+
+class KeywordMatcherTestCase(TempDirTestCase):
+    """Point the matcher's data files at the temporary directory."""
+
+    PATHS = {
+        'DATA_DIR': '',
+        'RAW_DATA_PATH': 'threads_raw.jsonl',
+        'LEGACY_RAW_DATA_PATH': 'threads_raw.json',
+        'OPPORTUNITIES_PATH': 'opportunities.json',
+        'OPPORTUNITY_IDS_PATH': 'opportunities.ids',
+        'DB_PATH': 'affiliate_data.json',
+    }
+
+    def setUp(self):
+        super().setUp()
+        for name, filename in self.PATHS.items():
+            self.addCleanup(setattr, keyword_matcher, name, getattr(keyword_matcher, name))
+            setattr(keyword_matcher, name, os.path.join(self.data_dir, filename))
+
+        keyword_matcher._db.cache_clear()
+        self.addCleanup(keyword_matcher._db.cache_clear)
+
+
+class LoadJsonArrayTest(TempDirTestCase):
+    def test_reads_array(self):
+        path = self.write('array.json', ' [ {"a": 1} , 2,\n"x" ] \n')
+        self.assertEqual(keyword_matcher._load_json_array(path), [{'a': 1}, 2, 'x'])
+
+    def test_reads_empty_array(self):
+        path = self.write('array.json', '[]')
+        self.assertEqual(keyword_matcher._load_json_array(path), [])
+
+    def test_rejects_malformed_separators(self):
+        for content in ['[,1]', '[1,,2]', '[1]]', '[1,]', '[1 2]', '[1']:
+            with self.subTest(content=content):
+                path = self.write('array.json', content)
+                self.assertIsNone(keyword_matcher._load_json_array(path))
+
+    def test_rejects_non_array(self):
+        for content in ['{"a": 1}', '1', '']:
+            with self.subTest(content=content):
+                path = self.write('array.json', content)
+                self.assertIsNone(keyword_matcher._load_json_array(path))
+
+
+class IterJsonLinesTest(TempDirTestCase):
+    def test_skips_blank_and_damaged_lines(self):
+        path = self.write('lines.jsonl', '{"id": "a"}\n\n{"id": \n{"id": "b"}\n')
+        self.assertEqual(list(keyword_matcher._iter_json_lines(path)), [{'id': 'a'}, {'id': 'b'}])
+
+
+class ProcessThreadsTest(KeywordMatcherTestCase):
+    def thread_ids(self, opportunities):
+        return [opp['thread_id'] for opp in opportunities]
+
+    def test_processes_legacy_raw_data(self):
+        self.write('threads_raw.json', keyword_matcher._dumps([MATCHING_THREAD]))
+        opportunities = keyword_matcher.process_threads_to_opportunities()
+        self.assertEqual(self.thread_ids(opportunities), ['abc123'])
+        self.assertEqual(opportunities[0]['affiliate_matches'][0]['program_name'], 'GamingGear')
+
+    def test_malformed_legacy_raw_data_yields_nothing(self):
+        thread = keyword_matcher._dumps(MATCHING_THREAD)
+        for content in ['[,' + thread + ']', '[' + thread + ',,' + thread + ']', '[' + thread + ']]']:
+            with self.subTest(content=content):
+                self.write('threads_raw.json', content)
+                self.assertEqual(keyword_matcher.process_threads_to_opportunities(), [])
+                self.assertFalse(os.path.exists(keyword_matcher.OPPORTUNITIES_PATH))
+
+    def test_prefers_json_lines_raw_data(self):
+        self.write('threads_raw.json', keyword_matcher._dumps([{**MATCHING_THREAD, 'id': 'legacy'}]))
+        self.write('threads_raw.jsonl', keyword_matcher._dumps(MATCHING_THREAD) + '\n')
+        opportunities = keyword_matcher.process_threads_to_opportunities()
+        self.assertEqual(self.thread_ids(opportunities), ['abc123'])
+
+    def test_processes_only_given_threads(self):
+        self.write('threads_raw.jsonl', keyword_matcher._dumps({**MATCHING_THREAD, 'id': 'stored'}) + '\n')
+        unmatched = {**MATCHING_THREAD, 'id': 'other', 'title': 'Weekly discussion thread'}
+        opportunities = keyword_matcher.process_threads_to_opportunities(new_threads=[MATCHING_THREAD, unmatched])
+        self.assertEqual(self.thread_ids(opportunities), ['abc123'])
+
+
+class FailingWrites:
+    """File wrapper whose writes fail, as if the process died mid-append."""
+
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, data):
+        raise OSError('interrupted')
+
+    def __getattr__(self, name):
+        return getattr(self.f, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.f.close()
+
+
+class AppendToJsonArrayTest(TempDirTestCase):
+    def append(self, content, records):
+        path = self.write('array.json', content)
+        appended = keyword_matcher._append_to_json_array(path, records)
+        return appended, self.read('array.json')
+
+    def test_appends_to_empty_array(self):
+        appended, content = self.append('[]', [{'a': 1}, {'b': 2}])
+        self.assertTrue(appended)
+        self.assertEqual(keyword_matcher._loads(content), [{'a': 1}, {'b': 2}])
+
+    def test_appends_after_existing_records(self):
+        appended, content = self.append('[\n  {"a": 1}\n]', [{'b': 2}])
+        self.assertTrue(appended)
+        self.assertEqual(keyword_matcher._loads(content), [{'a': 1}, {'b': 2}])
+
+    def test_drops_trailing_whitespace_after_closing_bracket(self):
+        appended, content = self.append('[]' + ' ' * 64 + '\n', [1])
+        self.assertTrue(appended)
+        self.assertEqual(content, '[1]')
+
+    def test_rejects_file_without_closing_bracket(self):
+        for original in ['[{"a": 1}', '{"a": 1}', '', ']']:
+            with self.subTest(original=original):
+                appended, content = self.append(original, [1])
+                self.assertFalse(appended)
+                self.assertEqual(content, original)
+
+    def test_interrupted_append_leaves_array_intact(self):
+        path = self.write('array.json', '[{"a": 1}]\n')
+        real_open = open
+        with mock.patch('keyword_matcher.open', create=True,
+                        side_effect=lambda *args, **kwargs: FailingWrites(real_open(*args, **kwargs))):
+            with self.assertRaises(OSError):
+                keyword_matcher._append_to_json_array(path, [{'b': 2}])
+        self.assertEqual(keyword_matcher._loads(self.read('array.json')), [{'a': 1}])
+
+
+class LoadOpportunityIdsTest(KeywordMatcherTestCase):
+    def test_missing_opportunities_file(self):
+        self.assertEqual(keyword_matcher._load_opportunity_ids(), set())
+
+    def test_rebuilds_missing_sidecar(self):
+        self.write('opportunities.json', '[{"thread_id": "a"}, {"thread_id": "b"}]')
+        self.assertEqual(keyword_matcher._load_opportunity_ids(), {'a', 'b'})
+        self.assertEqual(sorted(self.read('opportunities.ids').splitlines()), ['a', 'b'])
+
+    def test_trusts_current_sidecar(self):
+        self.write('opportunities.json', '[{"thread_id": "a"}]')
+        self.write('opportunities.ids', 'a\nb\n')
+        self.set_mtime_ns('opportunities.json', 1_000_000_000)
+        self.set_mtime_ns('opportunities.ids', 1_000_000_000)
+        self.assertEqual(keyword_matcher._load_opportunity_ids(), {'a', 'b'})
+
+    def test_rebuilds_sidecar_older_than_opportunities_file(self):
+        # What the Node server leaves behind when it resets opportunities.json
+        self.write('opportunities.json', '[]')
+        self.write('opportunities.ids', 'a\nb\n')
+        self.set_mtime_ns('opportunities.ids', 1_000_000_000)
+        self.set_mtime_ns('opportunities.json', 2_000_000_000)
+        self.assertEqual(keyword_matcher._load_opportunity_ids(), set())
+        self.assertEqual(self.read('opportunities.ids'), '')
+
+    def test_unreadable_opportunities_file(self):
+        self.write('opportunities.json', '[{"thread_id": "a"}')
+        self.assertIsNone(keyword_matcher._load_opportunity_ids())
+
+
+class SaveOpportunitiesTest(KeywordMatcherTestCase):
+    def saved_ids(self):
+        return [opp['thread_id'] for opp in keyword_matcher._loads(self.read('opportunities.json'))]
+
+    def test_appends_only_unseen_opportunities(self):
+        keyword_matcher.save_opportunities([{'thread_id': 'a'}, {'thread_id': 'b'}])
+        keyword_matcher.save_opportunities([{'thread_id': 'b'}, {'thread_id': 'c'}, {'thread_id': 'c'}])
+        self.assertEqual(self.saved_ids(), ['a', 'b', 'c'])
+        self.assertEqual(sorted(self.read('opportunities.ids').splitlines()), ['a', 'b', 'c'])
+
+    def test_starts_over_after_reset(self):
+        keyword_matcher.save_opportunities([{'thread_id': 'a'}, {'thread_id': 'b'}])
+        self.write('opportunities.json', '[]')
+        self.set_mtime_ns('opportunities.json', os.stat(os.path.join(self.data_dir, 'opportunities.ids')).st_mtime_ns + 1)
+        keyword_matcher.save_opportunities([{'thread_id': 'a'}, {'thread_id': 'c'}])
+        self.assertEqual(self.saved_ids(), ['a', 'c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,485 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'crawler'))
+
+import reddit_scraper
+from bs4 import BeautifulSoup
+
+
+class FakeClock:
+    """Stand-in for the time module whose sleeps advance a virtual clock."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ClockTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('reddit_scraper.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class HostTokenBucketTest(ClockTestCase):
+    def test_burst_then_waits_at_rate(self):
+        bucket = reddit_scraper.HostTokenBucket(rate=0.5, capacity=2)
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [2.0, 2.0])
+
+    def test_refills_up_to_capacity(self):
+        bucket = reddit_scraper.HostTokenBucket(rate=0.5, capacity=2)
+        bucket.acquire()
+        bucket.acquire()
+        self.clock.now += 60
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [2.0])
+
+    def test_reserved_tokens_stagger_callers(self):
+        # Callers that find the bucket empty each wait one interval longer
+        bucket = reddit_scraper.HostTokenBucket(rate=0.25, capacity=1)
+        bucket.acquire()
+        waits = []
+        for _ in range(3):
+            with mock.patch.object(self.clock, 'sleep', waits.append):
+                bucket.acquire()
+        self.assertEqual(waits, [4.0, 8.0, 12.0])
+
+    def test_defer_holds_back_next_request(self):
+        bucket = reddit_scraper.HostTokenBucket(rate=0.25, capacity=1)
+        bucket.defer(30)
+        bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [30.0])
+
+    def test_defer_never_shortens_existing_wait(self):
+        bucket = reddit_scraper.HostTokenBucket(rate=0.25, capacity=1)
+        bucket.defer(30)
+        bucket.defer(5)
+        bucket.acquire()
+        self.assertEqual(self.clock.sleeps, [30.0])
+
+    def test_default_pace_matches_fixed_delay(self):
+        with mock.patch.dict(reddit_scraper._HOST_BUCKETS, clear=True):
+            for _ in range(3):
+                reddit_scraper.wait_for_host('https://www.reddit.com/r/SEO/')
+            reddit_scraper.wait_for_host('https://old.reddit.com/r/SEO/')
+        self.assertEqual(self.clock.sleeps, [4.0, 4.0])
+
+
+def thread(thread_id, **fields):
+    return {'id': thread_id, 'title': f'Thread {thread_id}', 'subreddit': 'r/SEO', **fields}
+
+
+class RawStorageTestCase(unittest.TestCase):
+    """Point the scraper's data files at a temporary directory."""
+
+    PATHS = {
+        'DATA_DIR': '',
+        'RAW_DATA_PATH': 'threads_raw.jsonl',
+        'RAW_IDS_PATH': 'threads_ids.txt',
+        'LEGACY_RAW_DATA_PATH': 'threads_raw.json',
+        'OPPORTUNITIES_PATH': 'opportunities.json',
+        'HTTP_CACHE_DIR': 'http_cache',
+    }
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+        for name, filename in self.PATHS.items():
+            self.addCleanup(setattr, reddit_scraper, name, getattr(reddit_scraper, name))
+            setattr(reddit_scraper, name, os.path.join(self.data_dir, filename))
+
+    def path(self, filename):
+        return os.path.join(self.data_dir, filename)
+
+    def write(self, filename, content):
+        with open(self.path(filename), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def read(self, filename):
+        with open(self.path(filename), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def set_mtime_ns(self, filename, mtime_ns):
+        os.utime(self.path(filename), ns=(mtime_ns, mtime_ns))
+
+    def write_raw(self, *threads):
+        self.write('threads_raw.jsonl', ''.join(reddit_scraper._dumps(t) + '\n' for t in threads))
+
+    def stored_ids(self):
+        return [t['id'] for t in reddit_scraper._iter_raw_threads()]
+
+
+class ScanRawThreadIdsTest(RawStorageTestCase):
+    def test_empty_file(self):
+        self.write('threads_raw.jsonl', '')
+        self.assertEqual(reddit_scraper._scan_raw_thread_ids(), set())
+
+    def test_reads_leading_ids(self):
+        # Both separator styles, and a last line without its newline
+        self.write('threads_raw.jsonl', '{"id":"a","title":"x"}\n{"id": "b", "title": "y"}\n{"id":"c"}')
+        self.assertEqual(reddit_scraper._scan_raw_thread_ids(), {'a', 'b', 'c'})
+
+    def test_falls_back_for_reordered_fields(self):
+        self.write('threads_raw.jsonl', '{"id":"a"}\n{"title":"x","id":"b"}\n')
+        self.assertEqual(reddit_scraper._scan_raw_thread_ids(), {'a', 'b'})
+
+    def test_skips_truncated_lines(self):
+        for content in [
+            '{"id":"a"}\n{"id":"zzz","title":"Looking for the best gam\n{"id":"b"}\n',
+            '{"id":"a"}\n{"id":"zzz","title":"Looking for the best gam',
+        ]:
+            with self.subTest(content=content):
+                self.write('threads_raw.jsonl', content)
+                self.assertNotIn('zzz', reddit_scraper._scan_raw_thread_ids())
+
+    def test_counts_brace_split_across_blocks(self):
+        # The first line's '}' is the last byte of the first 1 MiB block
+        first = '{"id":"a","body":"%s"}'
+        content = first % ('x' * ((1 << 20) - len(first % ''))) + '\n{"id":"b"}\n'
+        self.assertEqual(content.index('}\n'), (1 << 20) - 1)
+        self.write('threads_raw.jsonl', content)
+        with mock.patch('reddit_scraper._iter_raw_threads', side_effect=AssertionError('fell back')):
+            self.assertEqual(reddit_scraper._scan_raw_thread_ids(), {'a', 'b'})
+
+
+class FindStoredThreadIdsTest(RawStorageTestCase):
+    def test_missing_raw_file_removes_sidecar(self):
+        self.write('threads_ids.txt', 'a\n')
+        self.assertEqual(reddit_scraper._find_stored_thread_ids({'a'}), (set(), 0))
+        self.assertFalse(os.path.exists(self.path('threads_ids.txt')))
+
+    def test_rebuilds_missing_sidecar(self):
+        self.write_raw(thread('a'), thread('b'))
+        self.assertEqual(reddit_scraper._find_stored_thread_ids({'a', 'c'}), ({'a'}, 2))
+        self.assertEqual(sorted(self.read('threads_ids.txt').splitlines()), ['a', 'b'])
+
+    def test_trusts_current_sidecar(self):
+        self.write_raw(thread('a'))
+        self.write('threads_ids.txt', 'a\nb\n')
+        self.set_mtime_ns('threads_raw.jsonl', 1_000_000_000)
+        self.set_mtime_ns('threads_ids.txt', 1_000_000_000)
+        self.assertEqual(reddit_scraper._find_stored_thread_ids({'b', 'c'}), ({'b'}, 2))
+
+    def test_rebuilds_sidecar_older_than_raw_file(self):
+        self.write_raw(thread('c'))
+        self.write('threads_ids.txt', 'a\nb\n')
+        self.set_mtime_ns('threads_ids.txt', 1_000_000_000)
+        self.set_mtime_ns('threads_raw.jsonl', 2_000_000_000)
+        self.assertEqual(reddit_scraper._find_stored_thread_ids({'a', 'c'}), ({'c'}, 1))
+        self.assertEqual(self.read('threads_ids.txt'), 'c\n')
+
+
+class SaveRawThreadsTest(RawStorageTestCase):
+    def test_appends_only_unseen_threads(self):
+        reddit_scraper.save_raw_threads([thread('a'), thread('b')])
+        new_threads = reddit_scraper.save_raw_threads([thread('b'), thread('c'), thread('c')])
+        self.assertEqual([t['id'] for t in new_threads], ['c'])
+        self.assertEqual(self.stored_ids(), ['a', 'b', 'c'])
+        self.assertEqual(self.read('threads_ids.txt').splitlines(), ['a', 'b', 'c'])
+
+    def test_resaves_thread_cut_short_by_interrupted_append(self):
+        self.write_raw(thread('a'))
+        # The process died mid-write: a partial line and no sidecar update
+        with open(self.path('threads_raw.jsonl'), 'a', encoding='utf-8') as f:
+            f.write('{"id":"zzz","title":"Looking for the best gam')
+
+        new_threads = reddit_scraper.save_raw_threads([thread('zzz'), thread('d')])
+        self.assertEqual([t['id'] for t in new_threads], ['zzz', 'd'])
+        self.assertEqual(self.stored_ids(), ['a', 'zzz', 'd'])
+
+    def test_migrates_legacy_raw_file(self):
+        self.write('threads_raw.json', reddit_scraper._dumps([thread('a'), thread('b'), thread('a', title='dup')]))
+        self.write('threads_ids.txt', 'stale\n')
+
+        new_threads = reddit_scraper.save_raw_threads([thread('b'), thread('c')])
+        self.assertEqual([t['id'] for t in new_threads], ['c'])
+        self.assertEqual(self.stored_ids(), ['a', 'b', 'c'])
+        self.assertEqual(self.read('threads_ids.txt').splitlines(), ['a', 'b', 'c'])
+        self.assertFalse(os.path.exists(self.path('threads_raw.json')))
+
+    def test_leaves_unparseable_legacy_file(self):
+        self.write('threads_raw.json', '[{"id": "a"}')
+        reddit_scraper.save_raw_threads([thread('b')])
+        self.assertEqual(self.stored_ids(), ['b'])
+        self.assertTrue(os.path.exists(self.path('threads_raw.json')))
+
+
+class Response:
+    def __init__(self, status_code, text='', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Session whose get() plays back queued responses or exceptions."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(dict(headers or {}))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class MakeRequestTest(RawStorageTestCase):
+    URL = 'https://www.reddit.com/r/SEO/hot/.json?limit=100'
+
+    def setUp(self):
+        super().setUp()
+        self.clock = FakeClock()
+        self.bucket = mock.Mock()
+        for target, new in [
+            ('reddit_scraper.time', self.clock),
+            ('reddit_scraper._host_bucket', mock.Mock(return_value=self.bucket)),
+            ('reddit_scraper._rotate_session', mock.Mock()),
+            ('reddit_scraper.random.random', mock.Mock(return_value=0.0)),
+        ]:
+            patcher = mock.patch(target, new)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def request(self, *responses, **kwargs):
+        self.session = FakeSession(*responses)
+        with mock.patch('reddit_scraper._session', return_value=self.session):
+            return reddit_scraper.make_request(self.URL, **kwargs)
+
+    def test_caches_ok_response_for_ttl(self):
+        self.assertEqual(self.request(Response(200, 'body', {'ETag': '"v1"'})), 'body')
+        self.clock.now += 30
+        self.assertEqual(self.request(ttl=60), 'body')
+        self.assertEqual(self.session.requests, [])
+
+    def test_reuses_cached_body_on_not_modified(self):
+        self.request(Response(200, 'body', {'ETag': '"v1"', 'Last-Modified': 'Wed, 01 Jan 2025 00:00:00 GMT'}))
+        self.clock.now += 120
+
+        self.assertEqual(self.request(Response(304), ttl=60), 'body')
+        self.assertEqual(self.session.requests, [{
+            'If-None-Match': '"v1"',
+            'If-Modified-Since': 'Wed, 01 Jan 2025 00:00:00 GMT',
+        }])
+        # The revalidated copy is fresh again
+        self.assertEqual(self.request(ttl=60), 'body')
+        self.assertEqual(self.session.requests, [])
+
+    def test_retry_after_defers_host_without_using_attempt(self):
+        body = self.request(Response(429, headers={'Retry-After': '30'}), Response(200, 'body'), retries=1)
+        self.assertEqual(body, 'body')
+        self.bucket.defer.assert_called_once_with(30.0)
+        reddit_scraper._rotate_session.assert_called_once_with()
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_retry_after_is_capped(self):
+        self.request(Response(429, headers={'Retry-After': '3600'}), Response(200, 'body'))
+        self.bucket.defer.assert_called_once_with(300)
+
+    def test_throttled_retries_are_bounded(self):
+        throttled = Response(429, headers={'Retry-After': '1'})
+        self.assertIsNone(self.request(*[throttled] * 4, retries=2))
+        self.assertEqual(len(self.session.requests), 4)
+        self.assertEqual(self.bucket.defer.call_count, 2)
+
+    def test_backs_off_exponentially(self):
+        body = self.request(Response(429), Response(500), Response(200, 'body'), delay=1)
+        self.assertEqual(body, 'body')
+        self.assertEqual(self.clock.sleeps, [1.0, 2.0])
+
+    def test_gives_up_after_retries(self):
+        error = reddit_scraper.requests.ConnectionError('refused')
+        self.assertIsNone(self.request(error, error, error, retries=3, delay=2))
+        self.assertEqual(len(self.session.requests), 3)
+        self.assertEqual(self.clock.sleeps, [2.0, 4.0])
+
+    def test_client_error_is_not_retried(self):
+        for status in (403, 404):
+            with self.subTest(status=status):
+                self.assertIsNone(self.request(Response(status), Response(200, 'body')))
+                self.assertEqual(len(self.session.requests), 1)
+                self.assertEqual(self.clock.sleeps, [])
+
+
+def post_html(*elements, thread_id='p1'):
+    link = f'<a data-click-id="body" href="/r/SEO/comments/{thread_id}/title/">Title</a>'
+    return f'<div data-testid="post-container">{link}{"".join(elements)}</div>'
+
+
+class ParseRedditThreadTest(unittest.TestCase):
+    def parse_one(self, *elements):
+        threads = reddit_scraper.parse_reddit_thread('<html><body>' + post_html(*elements) + '</body></html>', 'r/SEO')
+        self.assertEqual(len(threads), 1)
+        return threads[0]
+
+    def test_first_comments_span_wins(self):
+        # "No comments" is the comments span, and counts as none
+        thread = self.parse_one('<span>No comments</span>', '<span>5 comments</span>')
+        self.assertEqual(thread['comments'], 0)
+
+    def test_comment_count_with_separators(self):
+        self.assertEqual(self.parse_one('<span>1,234 comments</span>')['comments'], 1234)
+
+    def test_first_match_of_each_field(self):
+        thread = self.parse_one(
+            '<div data-testid="post-voting-value">Vote</div>',
+            '<div data-testid="post-voting-value">12</div>',
+            '<span><b>3 comments</b></span>',
+            '<span>7 comments in thread</span>',
+        )
+        self.assertEqual((thread['comments'], thread['upvotes']), (3, 0))
+
+    def test_vote_suffixes(self):
+        for text, upvotes in [('15', 15), ('1.2k', 1200), ('12.5K', 12500), ('3M', 3000000), ('Vote', 0), ('', 0)]:
+            with self.subTest(text=text):
+                thread = self.parse_one(f'<div data-testid="post-voting-value">{text}</div>')
+                self.assertEqual(thread['upvotes'], upvotes)
+
+
+def random_page(seed, posts=100):
+    """Build a listing page with shuffled, nested and missing post fields."""
+    rng = random.Random(seed)
+    votes = ['15', '1.2k', '12.5K', '3M', '7m', 'Vote', '', '<b>12</b>']
+    comments = ['{} comments', 'No comments', '<i>{}</i> comments', 'comment', '{} comments here',
+                '{}&nbsp;comments', '<b>{} comments</b>', '{},{:03} comments']
+
+    def maybe_nested(html):
+        return rng.choice([html, f'<div class="wrap">{html}</div>', f'<section><div>{html}</div></section>'])
+
+    out = ['<html><body><nav><a data-click-id="body" href="/r/x/comments/nav/">nav</a></nav>']
+    for i in range(posts):
+        count = rng.randint(0, 999)
+        fields = [
+            f'<h3>Title <em>{i}</em></h3>' if i % 5 else '',
+            '<h3>Second heading</h3>',
+            '<span data-testid="post_timestamp">5h</span>' if i % 4 else '',
+            '' if i % 17 == 0 else f'<a data-click-id="body" href="/r/x/comments/id{i}/t/">x</a>',
+            '<a data-click-id="other" href="/r/x/comments/wrong/">y</a>',
+            f'<a data-testid="post_author_link">u/a{i}</a>' if i % 3 else '<a>nope</a>',
+            maybe_nested(f'<div data-testid="post-voting-value">{rng.choice(votes)}</div>'),
+            maybe_nested(f'<div data-testid="post-voting-value">{rng.choice(votes)}</div>'),
+            maybe_nested(f'<span>{rng.choice(comments).format(count, count)}</span>'),
+            f'<span>{rng.randint(1, 9)} comments</span>',
+            '<div data-testid="post-flairs">Question</div>' if i % 2 else '',
+            maybe_nested('<div data-testid="post-content">{}</div>'.format(
+                rng.choice(['<p>a</p><p>b</p>', 'plain body', '', f'Title {i}']))),
+        ]
+        rng.shuffle(fields)
+        out.append('<div data-testid="post-container">' + ''.join(fields) + '</div>')
+        if i % 7 == 0:
+            out.append('<div class="ad"><span>99 comments</span><h3>Sponsored</h3></div>')
+    return ''.join(out) + '</body></html>'
+
+
+def find_post_elements(post):
+    """The per-field find() lookups the single-walk selector replaced."""
+    found = {
+        'title': post.find('h3'),
+        'link': post.find('a', {'data-click-id': 'body'}),
+        'author': post.find('a', {'data-testid': 'post_author_link'}),
+        'votes': post.find('div', {'data-testid': 'post-voting-value'}),
+        'comments': post.find('span', string=lambda text: text and 'comments' in text.lower()),
+        'flair': post.find('div', {'data-testid': 'post-flairs'}),
+        'timestamp': post.find('span', {'data-testid': 'post_timestamp'}),
+        'content': post.find('div', {'data-testid': 'post-content'}),
+    }
+    return {field: element for field, element in found.items() if element is not None}
+
+
+def reference_parse(html, subreddit):
+    """The original parser: a full parse tree and one find() per field."""
+    threads = []
+    for post in BeautifulSoup(html, 'html.parser').find_all('div', {'data-testid': 'post-container'}):
+        elements = find_post_elements(post)
+        title = elements['title'].text.strip() if 'title' in elements else "No Title"
+        link = elements.get('link')
+        if link is None or 'href' not in link.attrs:
+            continue
+        url = f"https://www.reddit.com{link['href']}"
+
+        upvotes_text = elements['votes'].text.strip() if 'votes' in elements else "0"
+        if 'k' in upvotes_text.lower():
+            upvotes = int(float(upvotes_text.lower().replace('k', '')) * 1000)
+        elif 'm' in upvotes_text.lower():
+            upvotes = int(float(upvotes_text.lower().replace('m', '')) * 1000000)
+        else:
+            upvotes = int(upvotes_text) if upvotes_text.isdigit() else 0
+
+        comments_text = elements['comments'].text.strip() if 'comments' in elements else "0 comments"
+        count_text = comments_text.split()[0].replace(',', '')
+
+        body = ""
+        if 'content' in elements:
+            paragraphs = elements['content'].find_all('p')
+            if paragraphs:
+                body = " ".join([p.text.strip() for p in paragraphs])
+            elif elements['content'].text.strip() != title:
+                body = elements['content'].text.strip()
+
+        threads.append({
+            'id': url.split('comments/')[1].split('/')[0] if '/comments/' in url else None,
+            'title': title,
+            'url': url,
+            'author': elements['author'].text.strip() if 'author' in elements else "Unknown",
+            'subreddit': subreddit,
+            'body': body,
+            'upvotes': upvotes,
+            'comments': int(count_text) if count_text.isdigit() else 0,
+            'flair': elements['flair'].text.strip() if 'flair' in elements else None,
+        })
+    return threads
+
+
+class ParserParityTest(unittest.TestCase):
+    SEEDS = range(4)
+
+    def test_single_walk_matches_per_field_find(self):
+        for seed in self.SEEDS:
+            with self.subTest(seed=seed):
+                soup = BeautifulSoup(random_page(seed), 'html.parser')
+                for post in soup.find_all('div', {'data-testid': 'post-container'}):
+                    selected = reddit_scraper._select_post_elements(post)
+                    expected = find_post_elements(post)
+                    self.assertEqual(sorted(selected), sorted(expected))
+                    for field, element in expected.items():
+                        self.assertIs(selected[field], element, field)
+
+    def test_parse_matches_original_parser(self):
+        for seed in self.SEEDS:
+            with self.subTest(seed=seed):
+                html = random_page(seed)
+                threads = reddit_scraper.parse_reddit_thread(html, 'r/x')
+                for thread in threads:
+                    del thread['created_utc'], thread['fetched_at']
+                self.assertEqual(threads, reference_parse(html, 'r/x'))
+
+
+if __name__ == '__main__':
+    unittest.main()